@@ -1,111 +1,768 @@
-from copy import deepcopy
-from game_constants import WHITE, BLACK
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Value
+from game_constants import WHITE, BLACK, MAX_SEARCH_DEPTH
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from zobrist import BLACK_TO_MOVE
+from bitboard import BitBoard
+from tablebase import Tablebase
+from search_stats import SearchStats
+
+# The vectorized evaluation of leaves is optional since it depends on NumPy
+try:
+    from batch_eval import evaluate_positions
+except ImportError:
+    evaluate_positions = None
+
+# Evaluation of a position won according to the endgame tablebase (the distance to the end of the game is subtracted so
+# that faster wins are preferred)
+TABLEBASE_WIN = 1000
+
+# Margin subtracted from the shared bound of the parallel search so that a root move searched before the one that set
+# the bound still gets an exact value when both are equal (evaluations are multiples of 1/14)
+TIE_MARGIN = 1e-9
+
+# Width of the null window of the principal variation search (smaller than the difference between any two evaluations)
+NULL_WINDOW = 1e-9
+
+# Late move reductions: minimum remaining depth and number of moves searched before a quiet move is reduced
+LMR_DEPTH = 3
+LMR_MOVES = 3
+
+# Half width of the aspiration window around the evaluation of the previous iteration (a man is worth between 1 and 2)
+ASPIRATION_WINDOW = 0.5
+
+# Switches of the search that the worker processes of the parallel search take from the AI that starts them
+SEARCH_SETTINGS = ('ordering', 'lazy_expansion', 'batch_leaves', 'quiescence', 'quiescence_nodes', 'stand_pat', 'pvs',
+                   'lmr')
+
+# State of each worker process of the parallel search: its own AI object and the shared best root score (from the root
+# player's point of view) along with the index of the root move that obtained it
+_worker_ai = None
+_shared_score = None
+_shared_index = None
+
+
+def _init_worker(difficulty, table_mb, tablebase_path, shared_score, shared_index, shared_stop, shared_nodes):
+    """
+    Initializes a worker process of the parallel search. Besides the best root score, the workers share a stop flag and
+    the count of the nodes searched by all of them (see AI.check_budget)
+    """
+    global _worker_ai, _shared_score, _shared_index
+    tablebase = Tablebase(tablebase_path) if tablebase_path is not None else None
+    _worker_ai = AI(difficulty, table_mb, tablebase=tablebase)
+    _worker_ai.stop_flag, _worker_ai.node_counter = shared_stop, shared_nodes
+    _worker_ai.exact_depth = True
+    _shared_score, _shared_index = shared_score, shared_index
+
+
+def _search_root_move(position_key, move, index, depth, max_player, beta, deadline, node_limit, settings):
+    """
+    Searches one root move in a worker process with the search switches ('settings') of the parent AI. The position is
+    received as the three integers of a BitBoard and the move as ((row, col), path). The best score found so far by any
+    worker is used as alpha (beta for the min player), and the score is shared with the other workers if it improves it.
+    The budget is the one of the whole iteration: 'deadline' is a time.time() value and 'node_limit' is the number of
+    nodes left for all the workers together. If the search has already been stopped (by the budget or by the parent),
+    the move is not searched. It returns the move index, its evaluation, whether the search was stopped and the number
+    of nodes searched
+    """
+    ai = _worker_ai
+    if ai.stop_flag.value:
+        return index, 0, True, 0
+    for name, value in settings.items():
+        setattr(ai, name, value)
+    ai.nodes = 0
+    ai.counted_nodes = 0
+    ai.stopped = False
+    # The deadline is converted to the clock of this process
+    ai.deadline = time.perf_counter() + (deadline - time.time()) if deadline is not None else None
+    ai.node_limit = node_limit
+    board = BitBoard(*position_key).to_board()
+
+    with _shared_score.get_lock():
+        score, best_index = _shared_score.value, _shared_index.value
+    # If the bound was set by a later root move, a tie must be resolved in favour of this move, so the bound is lowered
+    # to get an exact value
+    if best_index > index:
+        score -= TIE_MARGIN
+    sign = 1 if max_player else -1
+    alpha, beta = (score, beta) if max_player else (-beta, -score)
+
+    undo = ai.make_move(board, ai.decode_move(board, move))
+    evaluation = ai.minimax_alpha_beta(board, depth - 1, not max_player, alpha, beta, 1)[0]
+    ai.unmake_move(board, undo)
+
+    if not ai.stopped:
+        with _shared_score.get_lock():
+            if sign * evaluation > _shared_score.value or (sign * evaluation == _shared_score.value and
+                                                           index < _shared_index.value):
+                _shared_score.value, _shared_index.value = sign * evaluation, index
+    return index, evaluation, ai.stopped, ai.nodes
 
 
 class AI:
     """
     AI class to build the AI based on the minimax alpha beta pruning and the difficulty selected
     """
-    def __init__(self, difficulty):
+    def __init__(self, difficulty, table_mb=16, workers=0, tablebase=None, book=None):
         self.difficulty = difficulty
+        # Opening book (an OpeningBook object) consulted before searching
+        self.book = book
+        # Endgame tablebase (a Tablebase object) probed at every node with few enough pieces
+        self.tablebase = tablebase
+        # Number of worker processes of the parallel root search (0 or 1 for the serial search). The process pool is
+        # created the first time it is needed
+        self.workers = workers
+        self.table_mb = table_mb
+        # Transposition table entries are only used at their exact depth in the parallel search (in the parent and in
+        # the workers), so that its result does not depend on how the root moves are split between the workers. The
+        # serial search also uses deeper entries
+        self.exact_depth = workers > 1
+        self.executor = None
+        self.shared_score = None
+        self.shared_index = None
+        self.shared_stop = None
+        self.shared_nodes = None
+        # Only in the worker processes of the parallel search: the shared stop flag and node count of every worker, and
+        # the nodes of this worker already added to that count
+        self.stop_flag = None
+        self.node_counter = None
+        self.counted_nodes = 0
+        # Transposition table shared by every search of this AI (its size is given in megabytes)
+        self.table = TranspositionTable(table_mb)
+        # Search budget: the search stops when the deadline (seconds) or the node limit is reached
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stopped = False
+        # Set from another thread to abort the current search (see 'cancel')
+        self.cancelled = False
+        self.depth_reached = 0
+        # Move ordering: killer moves of each ply (quiet moves that caused a cutoff) and history scores of the quiet
+        # moves that caused cutoffs at any ply. The ordering can be disabled to compare the number of nodes searched
+        self.ordering = True
+        # Lazy expansion: the moves of a node are only generated when the search asks for them (see 'expand'). It can
+        # be disabled to compare the memory used and the moves generated by both approaches
+        self.lazy_expansion = True
+        self.generated = 0
+        self.killers = {}
+        self.history = {}
+        # Cutoff statistics: beta cutoffs and how many of them were caused by the first move searched
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        # Evaluate the children of the nodes at depth 1 at once with the vectorized (NumPy) evaluation
+        self.batch_leaves = False
+        # Quiescence search: the positions at depth 0 where the player to move has to jump are searched further (only
+        # the jumps) until they are quiet, with at most 'quiescence_nodes' nodes for each of them. Stand pat (taking the
+        # static evaluation as a bound of the value, see 'quiescence_search') is unsound with mandatory jumps, so it is
+        # off by default and only kept to compare
+        self.quiescence = True
+        self.quiescence_nodes = 256
+        self.stand_pat = False
+        self.quiescence_left = 0
+        # Search techniques on top of the alpha beta search (see 'negamax' and 'iterative_deepening'), which can be
+        # switched off to compare the nodes searched and the time to reach each depth. 'researches' counts the moves
+        # searched again after a null window, reduced or aspiration search
+        self.pvs = True
+        self.lmr = True
+        self.aspiration = True
+        self.researches = 0
+        # Statistics of the last move searched (see SearchStats). Leaf evaluations are always counted, while the time
+        # spent generating moves and evaluating positions is only measured if 'stats.timing' is True. If 'stats_path'
+        # is given, the statistics of each move are appended to that JSON lines file
+        self.stats = SearchStats()
+        self.stats_path = None
+        self.leaf_evaluations = 0
+        self.movegen_seconds = 0.0
+        self.eval_seconds = 0.0
+
+    def iterative_deepening(self, position, time_ms=None, max_nodes=None, max_depth=MAX_SEARCH_DEPTH):
+        """
+        Searches the position at depth 1, 2, 3... until the time budget (milliseconds) or the node budget runs out and
+        returns the evaluation and move of the last completed iteration. The first iteration is always completed, so
+        that a move is returned even with a very small budget.
+
+        With aspiration windows, each iteration is searched with a narrow window around the evaluation of the previous
+        one. If the evaluation falls outside it, the iteration is searched again with the window open on that side, and
+        with the full window if it fails again (on the other side), so that only exact evaluations are kept
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        self.generated = 0
+        self.researches = 0
+        self.leaf_evaluations = 0
+        self.movegen_seconds = self.eval_seconds = 0.0
+        self.cutoffs = self.first_cutoffs = 0
+        self.depth_reached = 0
+        self.stats.reset()
 
-    def minimax_alpha_beta(self, position, depth, max_player, alpha, beta):
+        # Positions in the opening book are played instantly
+        if self.book is not None:
+            entry = self.book.lookup(position)
+            if entry is not None:
+                self.stats.book = True
+                self.finish_stats(entry[0], entry[1], start)
+                return entry
+
+        # 'stopped' is cleared before 'cancelled' is read, so a 'cancel' call from another thread in between is not lost
+        self.stopped = False
+        if self.cancelled:
+            self.stopped = True
+        self.deadline = None
+        self.node_limit = None
+        # Killer moves are only meaningful for the current position, while the history scores are halved so that old
+        # information loses weight
+        self.killers = {}
+        self.history = {move: score // 2 for move, score in self.history.items() if score > 1}
+        best_eval, best_move = None, None
+
+        for depth in range(1, max_depth + 1):
+            depth_start, depth_nodes = time.perf_counter(), self.nodes
+            alpha, beta = float('-inf'), float('inf')
+            if self.aspiration and best_eval is not None:
+                alpha, beta = best_eval - ASPIRATION_WINDOW, best_eval + ASPIRATION_WINDOW
+            evaluation, move = self.minimax_alpha_beta(position, depth, True, alpha, beta)
+            # An evaluation at a finite bound of the window is only a bound of the real one
+            failures = 0
+            while not self.stopped and ((evaluation <= alpha and alpha != float('-inf')) or
+                                        (evaluation >= beta and beta != float('inf'))):
+                self.researches += 1
+                failures += 1
+                if failures > 1:
+                    alpha, beta = float('-inf'), float('inf')
+                elif evaluation <= alpha:
+                    alpha = float('-inf')
+                else:
+                    beta = float('inf')
+                evaluation, move = self.minimax_alpha_beta(position, depth, True, alpha, beta)
+            # The result of an interrupted iteration is discarded since some moves have not been searched
+            if self.stopped:
+                break
+            best_eval, best_move = evaluation, move
+            self.depth_reached = depth
+            self.stats.add_depth(depth, time.perf_counter() - depth_start, self.nodes - depth_nodes, evaluation)
+            # There is nothing else to search if the game is over
+            if move is None:
+                break
+
+            # The budget is applied from the second iteration on
+            if time_ms is not None:
+                self.deadline = start + time_ms / 1000
+                if time.perf_counter() >= self.deadline:
+                    break
+            if max_nodes is not None:
+                self.node_limit = max_nodes
+                if self.nodes >= max_nodes:
+                    break
+
+        self.deadline = None
+        self.node_limit = None
+        self.stopped = False
+        self.finish_stats(best_eval, best_move, start)
+        return best_eval, best_move
+
+    def finish_stats(self, evaluation, move, start):
+        """
+        Fills in the statistics of the search that has just finished and appends them to the JSON lines file (if any)
+        """
+        self.stats.collect(self, evaluation, move, time.perf_counter() - start)
+        if self.stats_path is not None:
+            self.stats.write_jsonl(self.stats_path)
+
+    def cancel(self):
+        """
+        Aborts the current search (it can be called from a different thread). Every node returns as soon as it checks
+        the 'stopped' flag, and the search does not return a move until 'cancelled' is reset
+        """
+        self.cancelled = True
+        self.stopped = True
+        # The worker processes of the parallel search (if any) stop too
+        if self.shared_stop is not None:
+            self.shared_stop.value = 1
+
+    def search_stats(self):
+        """
+        Statistics of the last search as a dictionary (see SearchStats)
+        """
+        return self.stats.as_dict()
+
+    def check_budget(self):
+        """
+        Stops the search if it has been cancelled or the deadline or the node limit has been reached. In a worker
+        process of the parallel search, the node limit applies to the nodes of every worker, and a worker that stops
+        sets the shared stop flag, so that the rest of workers (and the root moves still queued) stop too
+        """
+        if self.cancelled:
+            self.stopped = True
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.stopped = True
+        if self.stop_flag is not None:
+            with self.node_counter.get_lock():
+                self.node_counter.value += self.nodes - self.counted_nodes
+                nodes = self.node_counter.value
+            self.counted_nodes = self.nodes
+            if self.stop_flag.value or (self.node_limit is not None and nodes >= self.node_limit):
+                self.stopped = True
+            if self.stopped:
+                self.stop_flag.value = 1
+        elif self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+
+    def minimax_alpha_beta(self, position, depth, max_player, alpha, beta, ply=0):
         """
         Minimax alpha beta pruning algorithm that allows the AI to choose the best possible move based on the
-        heuristics defined in the Board class
+        heuristics defined in the Board class. The search is made on a single board: each move is made in place and
+        undone after its evaluation, so the board is left as it was. It returns the best evaluation (from the point of
+        view of the black player, the AI) and the best move as a (piece, path) tuple (see 'get_all_moves'). 'ply' is the
+        distance to the root, used by the killer moves. The search itself is made by 'negamax'
         """
-        # Get the current game state
-        end_game, winner = position.game_state()
+        if max_player:
+            evaluation, move = self.negamax(position, depth, 1, alpha, beta, ply)
+            return evaluation, move
+        evaluation, move = self.negamax(position, depth, -1, -beta, -alpha, ply)
+        return -evaluation, move
+
+    def negamax(self, position, depth, sign, alpha, beta, ply):
+        """
+        Negamax form of the alpha beta search: the evaluations are given from the point of view of the player to move
+        ('sign' is 1 for the black player and -1 for the white player), so both players maximize and the value of a
+        node is the opposite of the best value of its children. The transposition table also stores the evaluations
+        from the point of view of the player to move.
+
+        Besides plain alpha beta, each of these techniques can be switched on or off:
+         - Principal variation search ('pvs'): the moves after the first one are searched with a null window, which
+           only tells whether they are better than the best move so far, and searched again with the full window if
+           they are.
+         - Late move reductions ('lmr'): quiet moves ordered late are searched one ply shallower, and searched again at
+           full depth if they turn out to be better than the best move so far
+        """
+        # Count the node and check the search budget every few nodes. When the search is stopped, every node returns
+        # without storing anything
+        self.nodes += 1
+        node_start = self.nodes
+        if self.nodes % 32 == 0:
+            self.check_budget()
+        if self.stopped:
+            return 0, None
+
+        # Positions already searched at the same (or a greater) depth are taken from the transposition table if the
+        # stored bound is enough to answer with the current alpha and beta values. In the parallel search only entries
+        # of the same depth are used (see 'exact_depth')
+        max_player = sign == 1
+        key = position.hash ^ BLACK_TO_MOVE if max_player else position.hash
+        entry = self.table.probe(key)
+        table_move = None
+        if entry is not None:
+            _, stored_depth, bound, value, table_move = entry
+            depth_ok = stored_depth == depth if self.exact_depth else stored_depth >= depth
+            if depth_ok and (bound == EXACT or (bound == LOWER and value >= beta) or
+                             (bound == UPPER and value <= alpha)):
+                return value, self.decode_move(position, table_move)
+        alpha_start, beta_start = alpha, beta
+
+        # Positions with few pieces (except the root, where a move has to be chosen) are taken from the tablebase
+        if self.tablebase is not None and ply > 0:
+            evaluation = self.probe_tablebase(position, max_player)
+            if evaluation is not None:
+                return sign * evaluation, None
+
         # If the depth reached is zero or there is a winner, the algorithm returns the corresponding evaluation for a
-        # certain node
+        # certain node. The leaves are evaluated in the same way whether the game is over or not, so the game state is
+        # only needed above them, where it is obtained together with the (lazily generated) moves of the node
+        color = BLACK if max_player else WHITE
+        if depth > 0:
+            end_game, winner, moves = self.movegen(position.search_state, color)
+        if depth == 0 and self.quiescence:
+            self.quiescence_left = self.quiescence_nodes
+            evaluation = self.quiescence_search(position, sign, alpha, beta)
+            if self.stopped:
+                return 0, None
+            self.store(key, depth, evaluation, None, alpha_start, beta_start)
+            return evaluation, None
         if depth == 0 or winner != None:
-            return position.heuristics(self.difficulty), position
+            evaluation = sign * self.evaluate(position)
+            self.table.store(key, depth, EXACT, evaluation, None)
+            return evaluation, None
 
-        # Check whether it is the max player's turn (IA)
-        if max_player:
-            # Set maximum evaluation to minus infinite
-            max_eval = float('-inf')
-            best_move = None
-            # Loop over all possible moves for the black player (IA)
-            for move in self.get_all_moves(position, BLACK):
-                # Recursive call to get the evaluation of each node of the min player
-                evaluation = self.minimax_alpha_beta(move, depth - 1, False, alpha, beta)[0]
-
-                # Compare the maximum evaluation with the evaluation obtain by the recursive call
-                if max_eval < evaluation:
-                    max_eval = evaluation
-                    best_move = move
-                    # Get maximum between alpha and the maximum evaluation
-                    alpha = max(alpha, max_eval)
-                    # If beta is less than or equal to alpha, pruning is made and it is returned the maximum evaluation
-                    # along with the corresponding move that gets to that maximum value
-                    if beta <= alpha:
-                        break
-
-            return max_eval, best_move
-
-        # For the min player (human) it is an analogue process to the max player
-        else:
-            min_eval = float('inf')
-            best_move = None
-            for move in self.get_all_moves(position, WHITE):
-                evaluation = self.minimax_alpha_beta(move, depth - 1, True, alpha, beta)[0]
+        # With batched leaves, the children of a node at depth 1 are evaluated together (it is not used with the
+        # tablebase, since its positions are not evaluated with the heuristics, nor with the quiescence search)
+        if (depth == 1 and self.batch_leaves and self.tablebase is None and not self.quiescence and
+                evaluate_positions is not None):
+            return self.batch_node(position, moves, key, sign, table_move, ply, alpha_start, beta_start)
 
-                if min_eval > evaluation:
-                    min_eval = evaluation
-                    best_move = move
-                    beta = min(beta, min_eval)
-                    if beta <= alpha:
-                        break
+        # In the parallel mode, the root moves are split across the worker processes (which work with the evaluations
+        # from the point of view of the black player)
+        if ply == 0 and self.workers > 1:
+            root_moves = self.order_moves(self.movegen(list, moves), ply, table_move)
+            evaluation, best_move = self.parallel_root(position, root_moves, depth, max_player,
+                                                       *((alpha, beta) if max_player else (-beta, -alpha)))
+            if self.stopped:
+                return 0, None
+            self.store(key, depth, sign * evaluation, best_move, alpha_start, beta_start)
+            return sign * evaluation, best_move
 
-            return min_eval, best_move
+        # Loop over all possible moves of the player to move, sorted so that the best moves are tried first
+        best_eval = float('-inf')
+        best_move = None
+        for index, move in enumerate(self.expand(position, moves, color, ply, table_move)):
+            # Make the move, get the evaluation of the child from the point of view of this player with a recursive
+            # call and undo it
+            undo = self.make_move(position, move)
+            if index == 0 or not (self.pvs or self.lmr):
+                evaluation = -self.negamax(position, depth - 1, -sign, -beta, -alpha, ply + 1)[0]
+            else:
+                evaluation = self.search_late_move(position, move, index, depth, sign, alpha, beta, ply)
+            self.unmake_move(position, undo)
+            if self.stopped:
+                return 0, None
 
+            # Compare the best evaluation with the evaluation obtained by the recursive call
+            if best_eval < evaluation:
+                best_eval = evaluation
+                best_move = move
+                alpha = max(alpha, best_eval)
+                # If beta is less than or equal to alpha, pruning is made and it is returned the best evaluation along
+                # with the corresponding move that gets to that value
+                if beta <= alpha:
+                    self.cutoff(move, index, depth, ply)
+                    break
 
-    def get_all_moves(self, current_board, color):
-        """Function that returns all the possible board configuration as a consequence of each of the possible moves
-         that the AI can make
-         """
-        self.update_board = current_board
-        boards = []
-        # Loop over each piece from the player selected
-        for piece in current_board.get_all_pieces(color):
-            # Compute each possible board configuration for each possible move that a piece can make
-            new_board = self.board_state(piece, self.update_board, simulated_boards=[])
-            boards.extend(new_board)
-
-        return boards
-
-    def board_state(self, piece, current_board, simulated_boards, was_king=False, moved=False):
-        """
-        Given a piece, get its valid moves and the board state assocaited to each move
-        """
-        valid_moves = current_board.get_valid_moves(piece)
-        is_king = piece.king
-        # If a piece has been moved and there are still valid moves available (i.e., jumps available) and the piece has
-        # not be converted to king during that move, then each of the available moves are evaluated. If that piece has
-        # been moved, then each of the available moves are evaluated.
-        if (moved and list(valid_moves[1].keys()) and was_king == is_king) or not moved:
-            # Loop over each of the valid moves for that piece
-            for move in valid_moves[0]:
-                # Make a deep copy of the current board (temporal board)
-                temp_board = deepcopy(current_board)
-                # Get the piece from the deep copied board (temporal piece)
-                temp_piece = temp_board.get_piece(piece.row, piece.col)
-                # Remove jumped pieces (if any) from the deep copied board
-                temp_board.remove_piece(BLACK, valid_moves, temp_piece, move[0], move[1])
-                # Move temporal piece from the temporal board
-                temp_board.move(temp_piece, move[0], move[1])
-
-                # If a move has a jump available, then a recursive call is made to evaluate further possible moves
-                if move in list(valid_moves[1].keys()):
-                    simulated_boards += self.board_state(temp_piece, temp_board, simulated_boards, piece.king, True)
-
-                # If a move has no further available moves, it is appended the temporal board as a possible board
-                # configuration that the AI can evaluate
-                else:
-                    simulated_boards.append(temp_board)
+        self.store(key, depth, best_eval, best_move, alpha_start, beta_start)
+        if self.stats.tracing:
+            self.stats.add_node(ply, depth, alpha_start, beta_start, best_eval, self.encode_move(best_move),
+                                self.nodes - node_start + 1)
+        return best_eval, best_move
+
+    def search_late_move(self, position, move, index, depth, sign, alpha, beta, ply):
+        """
+        Evaluation of a move that is not the first one of its node (already made on the board) with the principal
+        variation search and/or the late move reductions. Each search that gets a value better than alpha is repeated
+        with the next level of accuracy: full depth first and then full window, so the value is the same as the one of
+        the plain search whenever it matters for the node
+        """
+        reduction = 0
+        if (self.lmr and depth >= LMR_DEPTH and ply > 0 and index >= LMR_MOVES and
+                not self.is_capture(move) and self.encode_move(move) not in self.killers.get(ply, ())):
+            reduction = 1
+        # With the principal variation search, the window only tells whether the move is better than alpha
+        window = -alpha - NULL_WINDOW if self.pvs else -beta
+
+        evaluation = -self.negamax(position, depth - 1 - reduction, -sign, window, -alpha, ply + 1)[0]
+        if evaluation > alpha and reduction:
+            self.researches += 1
+            evaluation = -self.negamax(position, depth - 1, -sign, window, -alpha, ply + 1)[0]
+        if alpha < evaluation < beta and self.pvs:
+            self.researches += 1
+            evaluation = -self.negamax(position, depth - 1, -sign, -beta, -alpha, ply + 1)[0]
+        return evaluation
+
+    def quiescence_search(self, position, sign, alpha, beta):
+        """
+        Searches the jumps of a position at the horizon until the player to move has no jump pending, so that the
+        position is not evaluated in the middle of an exchange of pieces. Jumps are mandatory, so the quiet positions
+        are evaluated with the heuristics and only the jumps are searched from the rest. As in 'negamax', evaluations
+        are given from the point of view of the player to move.
+
+        Stand pat (off by default): the static evaluation is taken as a lower bound of the value of the position for
+        the player to move, as if it could decline the jumps. Jumps are mandatory and can be answered with recaptures,
+        so this is not sound: it can return a different value than the full quiescence search. When the node limit of
+        the quiescence search is reached, the positions are evaluated statically
+        """
+        self.nodes += 1
+        self.quiescence_left -= 1
+        if self.nodes % 32 == 0:
+            self.check_budget()
+        if self.stopped:
+            return 0
+
+        color = BLACK if sign == 1 else WHITE
+        if self.quiescence_left <= 0 or not self.movegen(position.has_jumps, color):
+            return sign * self.evaluate(position)
+
+        # With stand pat, the value is taken to be never worse than the static evaluation
+        best = float('-inf')
+        if self.stand_pat:
+            static = sign * self.evaluate(position)
+            if static >= beta:
+                return static
+            alpha = max(alpha, static)
+            best = static
+
+        # Longer jump sequences are searched first
+        moves = sorted(self.movegen(position.get_side_moves, color, True), key=lambda move: len(move[1]), reverse=True)
+        for move in moves:
+            undo = self.make_move(position, move)
+            evaluation = -self.quiescence_search(position, -sign, -beta, -alpha)
+            self.unmake_move(position, undo)
+            if self.stopped:
+                return 0
+            if best < evaluation:
+                best = evaluation
+                alpha = max(alpha, best)
+                if beta <= alpha:
+                    break
+        return best
+
+    def batch_node(self, position, moves, key, sign, table_move, ply, alpha, beta):
+        """
+        Node at depth 1 whose children (leaves) are collected as bitboards and evaluated in one call. Every child is
+        evaluated, and the first best one is chosen as in the serial search
+        """
+        moves = self.order_moves(self.movegen(list, moves), ply, table_move)
+        self.generated += len(moves)
+        children = []
+        for move in moves:
+            undo = self.make_move(position, move)
+            children.append(BitBoard.from_board(position))
+            self.unmake_move(position, undo)
+        self.nodes += len(moves)
+
+        self.leaf_evaluations += len(children)
+        eval_start = time.perf_counter()
+        scores = sign * evaluate_positions(children, self.difficulty)
+        self.eval_seconds += time.perf_counter() - eval_start
+        index = int(scores.argmax())
+        evaluation, best_move = float(scores[index]), moves[index]
+        self.store(key, 1, evaluation, best_move, alpha, beta)
+        return evaluation, best_move
+
+    def parallel_root(self, position, moves, depth, max_player, alpha, beta):
+        """
+        Searches each root move in a worker process. The position is sent as a BitBoard (three integers) instead of the
+        Board and Piece objects. The workers share the best root score found so far, which is used as their alpha (or
+        beta) bound, and ties are resolved in favour of the first move in the search order, so the result is the same
+        as the serial search (without late move reductions, which the workers do not use)
+        """
+        if self.executor is None:
+            tablebase_path = self.tablebase.path if self.tablebase is not None else None
+            self.shared_score = Value('d', 0.0)
+            self.shared_index = Value('i', 0)
+            self.shared_stop = Value('b', 0)
+            self.shared_nodes = Value('q', 0)
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                initargs=(self.difficulty, self.table_mb, tablebase_path,
+                                                          self.shared_score, self.shared_index, self.shared_stop,
+                                                          self.shared_nodes))
+
+        # The shared score starts at the bound given by the caller and no move has reached it yet
+        sign = 1 if max_player else -1
+        with self.shared_score.get_lock():
+            self.shared_score.value = alpha if max_player else -beta
+            self.shared_index.value = len(moves)
+        # The workers get the budget of the whole search: the deadline (as a time.time() value, since each process has
+        # its own clock) and the nodes left. The stop flag is cleared before 'cancelled' is read, so that a 'cancel'
+        # call from another thread is not lost
+        with self.shared_nodes.get_lock():
+            self.shared_nodes.value = 0
+        self.shared_stop.value = 0
+        if self.cancelled:
+            self.shared_stop.value = 1
+        deadline = time.time() + (self.deadline - time.perf_counter()) if self.deadline is not None else None
+        node_limit = self.node_limit - self.nodes if self.node_limit is not None else None
+        position_key = BitBoard.from_board(position).key()
+        # The late move reductions depend on the killer moves and history scores, which differ between the processes, so
+        # they are switched off to get the same result as the serial search without them
+        settings = {name: getattr(self, name) for name in SEARCH_SETTINGS}
+        settings['lmr'] = False
+
+        futures = [self.executor.submit(_search_root_move, position_key, self.encode_move(move), index, depth,
+                                        max_player, beta if max_player else -alpha, deadline, node_limit, settings)
+                   for index, move in enumerate(moves)]
+        best_score, best_index = float('-inf'), None
+        for future in futures:
+            index, evaluation, stopped, nodes = future.result()
+            self.nodes += nodes
+            self.stopped = self.stopped or stopped
+            if sign * evaluation > best_score:
+                best_score, best_index = sign * evaluation, index
 
-            return list(set(simulated_boards))
+        if best_index is None:
+            return sign * best_score, None
+        return sign * best_score, moves[best_index]
+
+    def probe_tablebase(self, position, max_player):
+        """
+        Evaluation of a position according to the tablebase (None if the position has too many pieces). Wins and losses
+        are given a large value from the black player's point of view, and draws are evaluated as zero
+        """
+        result = self.tablebase.probe_board(position, BLACK if max_player else WHITE)
+        if result is None:
+            return None
+        outcome, distance = result
+        if outcome == 'draw':
+            return 0
+        evaluation = TABLEBASE_WIN - distance
+        if (outcome == 'win') != bool(max_player):
+            evaluation = -evaluation
+        return evaluation
+
+    def close(self):
+        """
+        Shuts down the worker processes of the parallel search
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def evaluate(self, position):
+        """
+        Heuristic evaluation of a leaf (from the point of view of the black player), counted and, if the statistics
+        measure times, timed
+        """
+        self.leaf_evaluations += 1
+        if not self.stats.timing:
+            return position.heuristics(self.difficulty)
+        start = time.perf_counter()
+        evaluation = position.heuristics(self.difficulty)
+        self.eval_seconds += time.perf_counter() - start
+        return evaluation
+
+    def movegen(self, function, *args):
+        """
+        Calls a move generation function (e.g., a board method or 'list' on a lazy iterator of moves), timed if the
+        statistics measure times
+        """
+        if not self.stats.timing:
+            return function(*args)
+        start = time.perf_counter()
+        result = function(*args)
+        self.movegen_seconds += time.perf_counter() - start
+        return result
+
+    def expand(self, position, moves, color, ply, table_move):
+        """
+        Yields the moves of a node in the order they are searched. With move ordering, the move stored in the
+        transposition table (if it is legal) is searched before generating the rest of moves, which are only generated
+        and sorted if it does not cause a cutoff. Without move ordering, each move is generated when the search asks for
+        it. 'moves' is the lazy iterator of the node's moves (see Board.iter_side_moves)
+        """
+        if not self.lazy_expansion:
+            moves = self.movegen(list, moves)
+            self.generated += len(moves)
+            yield from self.order_moves(moves, ply, table_move)
+            return
 
+        if not self.ordering:
+            for move in moves:
+                self.generated += 1
+                yield move
+            return
+
+        first = None
+        if table_move is not None:
+            first = self.decode_move(position, table_move)
+            if self.movegen(position.is_legal, first, color):
+                self.generated += 1
+                yield first
+            else:
+                first = None
+
+        # The table move (already counted) is generated again along with the rest of moves
+        moves = self.movegen(list, moves)
+        self.generated += len(moves) - (first is not None)
+        for move in self.order_moves(moves, ply, table_move):
+            if move != first:
+                yield move
+
+    def order_moves(self, moves, ply, table_move):
+        """
+        Sorts the moves so that the ones most likely to cause a cutoff are searched first: the best move stored in the
+        transposition table (the principal variation move in iterative deepening), then captures (longer chains
+        first), then the killer moves of this ply and finally the rest of moves by their history score
+        """
+        if not self.ordering or len(moves) < 2:
+            return moves
+        killers = self.killers.get(ply, ())
+        scored = []
+        for move in moves:
+            code = self.encode_move(move)
+            if code == table_move:
+                score = 3000000
+            elif self.is_capture(move):
+                score = 2000000 + len(move[1])
+            elif code in killers:
+                score = 1000000
+            else:
+                score = self.history.get(code, 0)
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def is_capture(self, move):
+        """
+        A move is a capture if its first hop moves the piece two rows
+        """
+        piece, path = move
+        return abs(path[0][0] - piece.row) == 2
+
+    def cutoff(self, move, index, depth, ply):
+        """
+        Updates the cutoff statistics and, for quiet moves, the killer moves of the ply and the history score
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_cutoffs += 1
+        if self.is_capture(move):
+            return
+        code = self.encode_move(move)
+        killers = self.killers.setdefault(ply, [])
+        if code not in killers:
+            killers.insert(0, code)
+            del killers[2:]
+        self.history[code] = self.history.get(code, 0) + depth * depth
+
+    def store(self, key, depth, evaluation, best_move, alpha, beta):
+        """
+        Stores the result of a node in the transposition table. With the alpha and beta values the node was searched
+        with, the evaluation is an upper bound if no move reached alpha, a lower bound if there was a cutoff and the
+        exact value otherwise
+        """
+        if evaluation <= alpha:
+            bound = UPPER
+        elif evaluation >= beta:
+            bound = LOWER
         else:
-            return [current_board]
+            bound = EXACT
+        self.table.store(key, depth, bound, evaluation, self.encode_move(best_move))
+
+    def encode_move(self, move):
+        """
+        Converts a (piece, path) move to ((row, col), path) so that it does not keep a reference to a Piece object
+        """
+        if move is None:
+            return None
+        piece, path = move
+        return (piece.row, piece.col), path
+
+    def decode_move(self, current_board, move):
+        """
+        Converts a ((row, col), path) move back to (piece, path) for a given board
+        """
+        if move is None:
+            return None
+        (row, col), path = move
+        return current_board.get_piece(row, col), path
+
+    def make_move(self, current_board, move):
+        """
+        Makes every hop of a (piece, path) move on the board and returns the list of undo records
+        """
+        piece, path = move
+        undos = []
+        for row, col in path:
+            undos.append(current_board.make_move(piece, row, col, current_board.hop_moves(piece, [(row, col)])))
+        return undos
+
+    def unmake_move(self, current_board, undos):
+        """
+        Undoes the hops of a move in reverse order
+        """
+        for undo in reversed(undos):
+            current_board.unmake_move(undo)
+
+    def get_all_moves(self, current_board, color):
+        """Function that returns all the possible moves that the AI can make. Each move is a tuple (piece, path), where
+         'path' is the list of squares visited by the piece (more than one square for multiple jumps). Jump sequences
+         that lead to the same position are only returned once
+         """
+        return current_board.get_side_moves(color, unique=True)
@@ -0,0 +1,188 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from game_constants import WHITE
+from bitboard import BitBoard
+
+
+class AIWorker:
+    """
+    AIWorker class to run the AI search in a background thread, so that the game loop keeps handling events and drawing
+    the board while the AI is thinking. The search is made on a copy of the game board and the chosen move is sent back
+    as ((row, col), path), which is converted to a move of the game board when it is applied.
+
+    While the human player is thinking, the worker can ponder: it searches the AI replies to the most likely moves of
+    the player and stores them in a cache, so that the reply is immediate if the player makes one of those moves.
+
+    If 'notify' is given, it is called (from the background thread) when a search finishes, e.g., to wake up a game
+    loop that waits for events
+    """
+    def __init__(self, ai=None, pondering=True, ponder_cache_size=256, notify=None):
+        self.ai = ai
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.position_hash = None
+        self.notify = notify
+        # Pondering: cache of replies (position hash -> (evaluation, move, search milliseconds)) and statistics
+        self.pondering = pondering
+        self.ponder_future = None
+        self.ponder_cache = {}
+        self.ponder_cache_size = ponder_cache_size
+        self.pondered = False
+        self.ponder_hash = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self.saved_ms = 0.0
+
+    def set_ai(self, ai):
+        """
+        Sets the AI used by the next searches (the current search, if any, is cancelled). The ponder cache is cleared
+        since its replies were found by the previous AI
+        """
+        self.cancel()
+        self.ai = ai
+        self.ponder_cache = {}
+        self.pondered = False
+        self.ponder_hash = None
+
+    def start(self, board, time_ms):
+        """
+        Starts searching the best move for a given board with a time budget (milliseconds). If the reply to this board
+        was found while pondering, the search finishes immediately with that reply
+        """
+        self.cancel()
+        self.ai.cancelled = False
+        self.position_hash = board.hash
+
+        if board.hash in self.ponder_cache:
+            evaluation, move, search_ms = self.ponder_cache.pop(board.hash)
+            self.ponder_hits += 1
+            self.saved_ms += search_ms
+            self.future = Future()
+            self.future.set_result((evaluation, move))
+        else:
+            if self.pondered:
+                self.ponder_misses += 1
+            position = BitBoard.from_board(board).to_board()
+            self.future = self.executor.submit(self.search, position, time_ms)
+        self.pondered = False
+        # The callback runs once the result is available (at once for a pondered reply)
+        if self.notify is not None:
+            self.future.add_done_callback(lambda future: self.notify())
+
+    def run(self, function, *args):
+        """
+        Runs a function in the background thread (e.g., to load the AI engine while the menu is shown) and returns its
+        future
+        """
+        return self.executor.submit(function, *args)
+
+    def search(self, position, time_ms):
+        """
+        Search run by the background thread
+        """
+        evaluation, move = self.ai.iterative_deepening(position, time_ms)
+        return evaluation, self.ai.encode_move(move)
+
+    def ponder(self, board, time_ms):
+        """
+        Starts pondering on a given board where it is the human player's (white) turn. Each reply is searched with the
+        same time budget as a normal search. Each board is only pondered once
+        """
+        if not self.pondering or self.busy() or self.pondering_busy() or board.hash == self.ponder_hash:
+            return
+        self.ai.cancelled = False
+        self.pondered = True
+        self.ponder_hash = board.hash
+        if len(self.ponder_cache) > self.ponder_cache_size:
+            self.ponder_cache = {}
+        position = BitBoard.from_board(board).to_board()
+        self.ponder_future = self.executor.submit(self.ponder_search, position, time_ms)
+
+    def ponder_search(self, position, time_ms):
+        """
+        Pondering run by the background thread. The player's moves are sorted by the evaluation of the position they
+        lead to (best moves for white first) and the AI reply to each of them is searched until the pondering is
+        cancelled
+        """
+        ai = self.ai
+        predicted = []
+        for move in ai.get_all_moves(position, WHITE):
+            code = ai.encode_move(move)
+            undo = ai.make_move(position, move)
+            predicted.append((position.heuristics(ai.difficulty), code))
+            ai.unmake_move(position, undo)
+        predicted.sort(key=lambda item: item[0])
+
+        for _, code in predicted:
+            if ai.cancelled:
+                return
+            undo = ai.make_move(position, ai.decode_move(position, code))
+            if position.hash not in self.ponder_cache:
+                start = time.perf_counter()
+                evaluation, reply = ai.iterative_deepening(position, time_ms)
+                # Replies of an interrupted search are not stored since they come from a shallower search
+                if not ai.cancelled:
+                    self.ponder_cache[position.hash] = (evaluation, ai.encode_move(reply),
+                                                        (time.perf_counter() - start) * 1000)
+            ai.unmake_move(position, undo)
+
+    def ponder_stats(self):
+        """
+        Pondering statistics: hits (replies taken from the cache), misses (the player made a move that had not been
+        pondered), hit rate and the total and average search time saved by the hits (milliseconds)
+        """
+        total = self.ponder_hits + self.ponder_misses
+        return {'hits': self.ponder_hits, 'misses': self.ponder_misses,
+                'hit_rate': self.ponder_hits / total if total else 0.0, 'saved_ms': self.saved_ms,
+                'saved_ms_per_hit': self.saved_ms / self.ponder_hits if self.ponder_hits else 0.0}
+
+    def busy(self):
+        """
+        Checks whether a search has been started and has not finished yet
+        """
+        return self.future is not None and not self.future.done()
+
+    def pondering_busy(self):
+        """
+        Checks whether the worker is pondering
+        """
+        return self.ponder_future is not None and not self.ponder_future.done()
+
+    def ready(self):
+        """
+        Checks whether a search has finished and its move has not been taken yet
+        """
+        return self.future is not None and self.future.done()
+
+    def matches(self, board):
+        """
+        Checks whether a given board is the one being searched (it is not if, e.g., the game has been reset)
+        """
+        return board.hash == self.position_hash
+
+    def result(self, board):
+        """
+        Returns the move found by the finished search as a (piece, path) move of a given board
+        """
+        evaluation, move = self.future.result()
+        self.future = None
+        return self.ai.decode_move(board, move)
+
+    def cancel(self):
+        """
+        Aborts the current search and pondering (if any) and waits for the thread to return, which takes at most one
+        search node
+        """
+        futures = [future for future in (self.future, self.ponder_future) if future is not None]
+        if futures:
+            self.ai.cancel()
+            wait(futures)
+        self.future = None
+        self.ponder_future = None
+
+    def shutdown(self):
+        """
+        Cancels the current search and stops the background thread
+        """
+        self.cancel()
+        self.executor.shutdown()
@@ -0,0 +1,107 @@
+import numpy as np
+from game_constants import BLACK, ROWS
+from bitboard import ROW_MASK
+
+"""
+.py file with the vectorized evaluation of many positions at once. Positions are given either as bitboard planes
+(three arrays with the black pieces, white pieces and kings of each position) or as a stack of (N, 8, 8) grids, and
+the heuristics of Board.heuristics are computed with NumPy operations. The results are exactly the same as the ones of
+Board.heuristics and BitBoard.heuristics
+"""
+
+# Grid codes of each piece kind
+EMPTY, BLACK_MAN, BLACK_KING, WHITE_MAN, WHITE_KING = 0, 1, 2, -1, -2
+
+# Hard heuristic: value of a man in each row multiplied by D (see Board.position_points) and value of a king
+D = ROWS - 1
+KING_POINTS = 2
+ROWS_RANGE = np.arange(ROWS, dtype=np.int64)
+BLACK_POINTS = np.abs(ROWS_RANGE - D) + D
+WHITE_POINTS = ROWS_RANGE + D
+ROW_MASKS = np.array(ROW_MASK, dtype=np.uint32)
+
+
+def _swar_count(bits):
+    """
+    Population count of each uint32 element with bitwise operations (NumPy 1.x has no 'bitwise_count')
+    """
+    bits = bits - ((bits >> 1) & 0x55555555)
+    bits = (bits & 0x33333333) + ((bits >> 2) & 0x33333333)
+    bits = (bits + (bits >> 4)) & 0x0F0F0F0F
+    return (bits * 0x01010101) >> 24
+
+
+# Population count of each element of an array: the NumPy function if it exists (NumPy 2.x) or the fallback
+popcount = getattr(np, 'bitwise_count', _swar_count)
+
+
+def planes(positions):
+    """
+    Stacks a list of BitBoard positions in three uint32 arrays (black pieces, white pieces and kings)
+    """
+    black = np.fromiter((position.black for position in positions), dtype=np.uint32, count=len(positions))
+    white = np.fromiter((position.white for position in positions), dtype=np.uint32, count=len(positions))
+    kings = np.fromiter((position.kings for position in positions), dtype=np.uint32, count=len(positions))
+    return black, white, kings
+
+
+def grids(boards):
+    """
+    Stacks a list of Board objects in an (N, 8, 8) int8 array with the grid codes of each square
+    """
+    stacked = np.zeros((len(boards), ROWS, ROWS), dtype=np.int8)
+    for n, board in enumerate(boards):
+        for row in board.board:
+            for piece in row:
+                if piece != 0:
+                    code = BLACK_KING if piece.king else BLACK_MAN
+                    stacked[n, piece.row, piece.col] = code if piece.color == BLACK else -code
+    return stacked
+
+
+def _combine(black_left, white_left, black_kings, white_kings, points, difficulty):
+    """
+    Computes the heuristic of each position from its piece counts and (for the hard mode) the points of its men
+    """
+    if difficulty == 1:
+        return (black_left - white_left).astype(np.float64)
+    elif difficulty == 2:
+        return black_left - white_left + (black_kings - white_kings) * 1.5
+    return points / D + (black_kings - white_kings) * KING_POINTS
+
+
+def evaluate_planes(black, white, kings, difficulty):
+    """
+    Heuristic of each position given as bitboard planes. The men of each row are counted with population counts
+    """
+    black_left = popcount(black).astype(np.int64)
+    white_left = popcount(white).astype(np.int64)
+    black_kings = popcount(black & kings).astype(np.int64)
+    white_kings = popcount(white & kings).astype(np.int64)
+    points = None
+    if difficulty == 3:
+        black_men = popcount((black & ~kings)[:, None] & ROW_MASKS[None, :]).astype(np.int64)
+        white_men = popcount((white & ~kings)[:, None] & ROW_MASKS[None, :]).astype(np.int64)
+        points = black_men @ BLACK_POINTS - white_men @ WHITE_POINTS
+    return _combine(black_left, white_left, black_kings, white_kings, points, difficulty)
+
+
+def evaluate_grids(stacked, difficulty):
+    """
+    Heuristic of each position given as an (N, 8, 8) array of grid codes
+    """
+    black_men = (stacked == BLACK_MAN).sum(axis=2, dtype=np.int64)
+    white_men = (stacked == WHITE_MAN).sum(axis=2, dtype=np.int64)
+    black_kings = (stacked == BLACK_KING).sum(axis=(1, 2), dtype=np.int64)
+    white_kings = (stacked == WHITE_KING).sum(axis=(1, 2), dtype=np.int64)
+    black_left = black_men.sum(axis=1) + black_kings
+    white_left = white_men.sum(axis=1) + white_kings
+    points = black_men @ BLACK_POINTS - white_men @ WHITE_POINTS
+    return _combine(black_left, white_left, black_kings, white_kings, points, difficulty)
+
+
+def evaluate_positions(positions, difficulty):
+    """
+    Heuristic of each BitBoard position of a list
+    """
+    return evaluate_planes(*planes(positions), difficulty)
@@ -0,0 +1,475 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from game_constants import WHITE, BLACK, WIDTH, HEIGHT
+from bitboard import BitBoard
+from AI import AI
+from search_stats import SearchStats
+
+"""
+.py file with headless benchmarks of the AI. Run 'python benchmark.py <benchmark> --help' to see the options of each one
+"""
+
+# Perft positions: name, position (black pieces, white pieces and kings of a BitBoard), player to move and number of
+# leaves at depth 1, 2, 3... The counts of the initial position are the known values of English draughts and the rest
+# were obtained with the original move generator (before the single-pass generator)
+PERFT_POSITIONS = [
+    ('initial', (4293918720, 4095, 0), BLACK, [7, 49, 302, 1469, 7361, 36768, 179740]),
+    ('multiple_jump', (2264989712, 134225096, 0), WHITE, [2, 10, 40, 208, 1185, 5806]),
+    ('kings', (17309953, 2147483648, 2147483905), BLACK, [9, 18, 158, 474, 4194, 11625]),
+    ('king_capture', (4264034560, 38104, 256), WHITE, [1, 8, 57, 289, 1663, 8352]),
+    ('jump_choice', (4287889920, 34303, 0), WHITE, [3, 5, 21, 113, 791, 4627]),
+]
+
+
+def sample_positions(count, seed=0, max_plies=40):
+    """
+    Returns a reproducible list of BitBoard positions reached by random moves from the initial position. Only positions
+    where the black player (AI) still has moves are kept
+    """
+    generator = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position, color = BitBoard.initial(), BLACK
+        for _ in range(generator.randint(0, max_plies)):
+            moves = position.get_moves(color)
+            if not moves:
+                break
+            position = position.apply(generator.choice(moves), color)
+            color = WHITE if color == BLACK else BLACK
+        if position.get_moves(BLACK):
+            positions.append(position)
+    return positions
+
+
+def perft(ai, board, color, depth):
+    """
+    Number of leaves of the move tree of a board at a given depth. Every legal move is counted (including the jump
+    sequences that lead to the same position)
+    """
+    moves = board.get_side_moves(color)
+    if depth == 1:
+        return len(moves)
+    opponent = WHITE if color == BLACK else BLACK
+    leaves = 0
+    for move in moves:
+        undo = ai.make_move(board, move)
+        leaves += perft(ai, board, opponent, depth - 1)
+        ai.unmake_move(board, undo)
+    return leaves
+
+
+def bench_perft(max_depth=6):
+    """
+    Runs perft on the stored positions up to 'max_depth' (or the deepest known count) and checks every count. The
+    speed of the move generator is reported as leaves per second
+    """
+    ai = AI(1)
+    results = []
+    for name, key, color, counts in PERFT_POSITIONS:
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            board = BitBoard(*key).to_board()
+            start = time.perf_counter()
+            leaves = perft(ai, board, color, depth)
+            seconds = time.perf_counter() - start
+            results.append({'position': name, 'depth': depth, 'leaves': leaves, 'expected': expected,
+                            'ok': leaves == expected, 'seconds': seconds,
+                            'leaves_per_second': leaves / seconds if seconds else None})
+    return {'benchmark': 'perft', 'ok': all(result['ok'] for result in results), 'results': results}
+
+
+def bench_difficulty(depth=8):
+    """
+    Times a fixed-depth search of each perft position at each difficulty (heuristic) and reports the nodes per second
+    """
+    results = []
+    for difficulty in (1, 2, 3):
+        nodes, seconds = 0, 0.0
+        for name, key, color, counts in PERFT_POSITIONS:
+            ai = AI(difficulty)
+            board = BitBoard(*key).to_board()
+            start = time.perf_counter()
+            ai.minimax_alpha_beta(board, depth, color == BLACK, float('-inf'), float('inf'))
+            seconds += time.perf_counter() - start
+            nodes += ai.nodes
+        results.append({'difficulty': difficulty, 'nodes': nodes, 'seconds': seconds,
+                        'nodes_per_second': nodes / seconds})
+    return {'benchmark': 'difficulty', 'depth': depth, 'positions': len(PERFT_POSITIONS), 'results': results}
+
+
+def bench_parallel(depth=4, difficulty=3, count=6, max_workers=None):
+    """
+    Times a fixed-depth search of the sample positions with the serial search and with the parallel root search for
+    2, 3... up to 'max_workers' processes. It reports the speedup over the serial search and checks that every parallel
+    search returns the same evaluation and move ('ok' is False otherwise). The late move reductions are switched off,
+    since the parallel search does not use them
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    positions = sample_positions(count)
+    results = []
+    serial_results, serial_time = None, None
+    for workers in range(1, max_workers + 1):
+        ai = AI(difficulty, workers=workers)
+        # The serial search is run with the same rules as the parallel one (no late move reductions and transposition
+        # table entries used only at their exact depth), so that the results can be compared
+        ai.lmr = False
+        ai.exact_depth = True
+        # The worker processes are started before timing
+        if workers > 1:
+            ai.minimax_alpha_beta(positions[0].to_board(), 1, True, float('-inf'), float('inf'))
+        found = []
+        start = time.perf_counter()
+        for position in positions:
+            ai.table.clear()
+            ai.killers, ai.history = {}, {}
+            board = position.to_board()
+            evaluation, move = ai.minimax_alpha_beta(board, depth, True, float('-inf'), float('inf'))
+            found.append((evaluation, ai.encode_move(move)))
+        elapsed = time.perf_counter() - start
+        ai.close()
+
+        if serial_time is None:
+            serial_results, serial_time = found, elapsed
+        results.append({'workers': workers, 'seconds': elapsed, 'speedup': serial_time / elapsed,
+                        'identical': found == serial_results})
+    return {'benchmark': 'parallel', 'depth': depth, 'positions': count, 'cpu_count': os.cpu_count(),
+            'results': results, 'ok': all(result['identical'] for result in results)}
+
+
+def bench_batch(count=2000, repeat=5):
+    """
+    Throughput (positions per second) of the scalar evaluation (Board.heuristics) and of the vectorized evaluation of
+    bitboard planes and (N, 8, 8) grids for each difficulty. It also checks that every evaluation gives the same scores.
+    The vectorized evaluation is imported here since it needs NumPy, which the other benchmarks do not
+    """
+    from batch_eval import evaluate_planes, evaluate_grids, planes, grids
+    positions = sample_positions(count, seed=1, max_plies=80)
+    boards = [position.to_board() for position in positions]
+    stacked_planes, stacked_grids = planes(positions), grids(boards)
+    results = []
+    for difficulty in (1, 2, 3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scalar = [board.heuristics(difficulty) for board in boards]
+        scalar_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            batch_planes = evaluate_planes(*stacked_planes, difficulty)
+        planes_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            batch_grids = evaluate_grids(stacked_grids, difficulty)
+        grids_time = (time.perf_counter() - start) / repeat
+
+        results.append({'difficulty': difficulty, 'scalar_per_second': count / scalar_time,
+                        'planes_per_second': count / planes_time, 'grids_per_second': count / grids_time,
+                        'identical': scalar == list(batch_planes) == list(batch_grids)})
+    return {'benchmark': 'batch', 'positions': count, 'results': results}
+
+
+def bench_expansion(depth=6, difficulty=3, count=10):
+    """
+    Peak memory per search (traced with tracemalloc), moves generated per node and time of a fixed-depth search of the
+    sample positions with the eager expansion (every move of a node generated and sorted before searching the first
+    one) and with the lazy expansion. Both searches must return the same evaluations and moves
+    """
+    positions = sample_positions(count, seed=2)
+    results = []
+    found = {}
+    for lazy in (False, True):
+        ai = AI(difficulty)
+        ai.lazy_expansion = lazy
+        peaks, nodes, generated, seconds = [], 0, 0, 0.0
+        found[lazy] = []
+        for position in positions:
+            ai.table.clear()
+            ai.killers, ai.history = {}, {}
+            ai.nodes = ai.generated = 0
+            board = position.to_board()
+            tracemalloc.start()
+            start = time.perf_counter()
+            evaluation, move = ai.minimax_alpha_beta(board, depth, True, float('-inf'), float('inf'))
+            seconds += time.perf_counter() - start
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            nodes += ai.nodes
+            generated += ai.generated
+            found[lazy].append((evaluation, ai.encode_move(move)))
+        results.append({'expansion': 'lazy' if lazy else 'eager', 'nodes': nodes,
+                        'moves_generated_per_node': generated / nodes, 'peak_kb_mean': sum(peaks) / len(peaks) / 1024,
+                        'peak_kb_max': max(peaks) / 1024, 'seconds': seconds})
+    return {'benchmark': 'expansion', 'depth': depth, 'positions': count, 'results': results,
+            'identical': found[False] == found[True]}
+
+
+def bench_search(depth=7, difficulty=3, count=12):
+    """
+    Nodes and time needed by the iterative deepening to reach a fixed depth on the sample positions with the plain
+    alpha beta search and with each search technique (principal variation search, aspiration windows and late move
+    reductions) alone and together. It also counts the positions where the evaluation and the move are the same as
+    the ones of the plain search (the late move reductions can change them)
+    """
+    positions = sample_positions(count, seed=3)
+    techniques = ('pvs', 'aspiration', 'lmr')
+    configurations = [('plain', ())] + [(technique, (technique,)) for technique in techniques] + [('all', techniques)]
+    results = []
+    plain = None
+    for name, enabled in configurations:
+        nodes, seconds, researches, found = 0, 0.0, 0, []
+        for position in positions:
+            ai = AI(difficulty)
+            for technique in techniques:
+                setattr(ai, technique, technique in enabled)
+            board = position.to_board()
+            start = time.perf_counter()
+            evaluation, move = ai.iterative_deepening(board, max_depth=depth)
+            seconds += time.perf_counter() - start
+            nodes += ai.nodes
+            researches += ai.researches
+            found.append((evaluation, ai.encode_move(move)))
+        if plain is None:
+            plain = found
+        results.append({'search': name, 'nodes': nodes, 'seconds': seconds, 'researches': researches,
+                        'same_evaluation': sum(a[0] == b[0] for a, b in zip(found, plain)),
+                        'same_move': sum(a[1] == b[1] for a, b in zip(found, plain))})
+    return {'benchmark': 'search', 'depth': depth, 'positions': count, 'results': results}
+
+
+def bench_stats(depth=7, difficulty=3, count=12, trace_path=None):
+    """
+    Time needed by the iterative deepening to reach a fixed depth on the sample positions with the search statistics
+    disabled (only the plain counters), measuring times and also tracing every interior node. The statistics of each
+    search are appended to 'trace_path' (JSON lines) if given
+    """
+    positions = sample_positions(count, seed=3)
+    results = []
+    for name, timing, tracing in (('counters', False, False), ('timing', True, False), ('tracing', True, True)):
+        nodes, seconds, movegen_seconds, eval_seconds = 0, 0.0, 0.0, 0.0
+        for position in positions:
+            ai = AI(difficulty)
+            ai.stats = SearchStats(timing, tracing)
+            if tracing:
+                ai.stats_path = trace_path
+            board = position.to_board()
+            start = time.perf_counter()
+            ai.iterative_deepening(board, max_depth=depth)
+            seconds += time.perf_counter() - start
+            nodes += ai.nodes
+            movegen_seconds += ai.movegen_seconds
+            eval_seconds += ai.eval_seconds
+        results.append({'stats': name, 'nodes': nodes, 'seconds': seconds, 'movegen_seconds': movegen_seconds,
+                        'eval_seconds': eval_seconds})
+    return {'benchmark': 'stats', 'depth': depth, 'positions': count, 'results': results}
+
+
+def bench_render(frames=600):
+    """
+    Time per frame of Game.update drawing the whole window and drawing only the squares that changed, both while
+    nothing changes (idle frames) and while a piece is selected and deselected every frame. It uses a hidden window,
+    so it can run without a display
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from game import Game
+    pygame.init()
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = []
+    for dirty in (False, True):
+        for scenario in ('idle', 'selection'):
+            game = Game(win, BLACK)
+            game.dirty_rendering = dirty
+            game.update()
+            start = time.perf_counter()
+            for frame in range(frames):
+                if scenario == 'selection':
+                    if frame % 2 == 0:
+                        game.select(5, 0)
+                    else:
+                        game.selected = None
+                game.update()
+            seconds = time.perf_counter() - start
+            results.append({'rendering': 'dirty' if dirty else 'full', 'scenario': scenario,
+                            'ms_per_frame': 1000 * seconds / frames})
+    pygame.quit()
+    return {'benchmark': 'render', 'frames': frames, 'results': results}
+
+
+def bench_idle(seconds=5.0, fps=60, timeout_ms=500):
+    """
+    CPU usage (fraction of a core) of the game loop while it waits for a click, with the fixed frame rate loop (draws
+    'fps' frames per second, either the whole window or only the dirty squares) and with the event-driven loop (sleeps
+    until an event or a timeout), and how long the event-driven loop takes to wake up when an AI search finishes. It
+    uses a hidden window, so it can run without a display (note that the dummy video driver of SDL polls for events
+    every millisecond while waiting, whereas the desktop drivers sleep)
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import threading
+    import pygame
+    from game import Game
+    pygame.init()
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = []
+    for mode in ('fixed_full', 'fixed', 'event'):
+        game = Game(win, WHITE)
+        # The fixed frame rate loop is measured drawing the whole window in each frame too (as before the dirty rects)
+        game.dirty_rendering = mode != 'fixed_full'
+        clock = pygame.time.Clock()
+        frames = 0
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        while time.perf_counter() - wall_start < seconds:
+            if mode != 'event':
+                clock.tick(fps)
+                pygame.event.get()
+            else:
+                game.update()
+                pygame.event.wait(timeout_ms)
+                pygame.event.get()
+            game.update()
+            frames += 1
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        results.append({'loop': mode, 'cpu_fraction': cpu / wall, 'iterations_per_second': frames / wall})
+
+    # Wake-up latency: a background thread posts the event of a finished search, as the AI worker does
+    ai_event = pygame.event.custom_type()
+    latencies = []
+    for _ in range(10):
+        posted = []
+        thread = threading.Timer(0.05, lambda: (posted.append(time.perf_counter()),
+                                                pygame.event.post(pygame.event.Event(ai_event))))
+        thread.start()
+        while pygame.event.wait(timeout_ms).type != ai_event:
+            pass
+        latencies.append(1000 * (time.perf_counter() - posted[0]))
+        thread.join()
+    pygame.quit()
+    return {'benchmark': 'idle', 'seconds': seconds, 'fps': fps, 'timeout_ms': timeout_ms, 'results': results,
+            'wake_ms': max(latencies)}
+
+
+STARTUP_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import main
+app = main.Main(start=False, lazy={lazy})
+app.show_main_menu()
+first_frame, first_frame_clock = time.perf_counter(), time.time()
+while app.pending:
+    app.warm_up()
+app.engine.result()
+ready = time.perf_counter()
+print(json.dumps({{'first_frame_ms': 1000 * (first_frame - start), 'ready_ms': 1000 * (ready - start),
+                  'first_frame_clock': first_frame_clock}}))
+'''
+
+
+def bench_startup(runs=5):
+    """
+    Start-up time of the game in a new process, from the import of the main module to the first frame of the main
+    menu, and until everything (submenus, sprites and AI engine) has been loaded, with the lazy start-up and with
+    everything loaded before the main menu is shown. It also measures the time from the launch of the process (Python
+    interpreter included) to the first frame. Each value is the median of 'runs' processes with a hidden window
+    """
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for lazy in (False, True):
+        runs_data = []
+        for _ in range(runs):
+            launch = time.time()
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(lazy=lazy)], cwd=directory, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            data = json.loads(output.strip().splitlines()[-1])
+            data['launch_to_first_frame_ms'] = 1000 * (data['first_frame_clock'] - launch)
+            runs_data.append(data)
+        result = {'startup': 'lazy' if lazy else 'eager'}
+        for key in ('first_frame_ms', 'ready_ms', 'launch_to_first_frame_ms'):
+            result[key] = sorted(data[key] for data in runs_data)[runs // 2]
+        results.append(result)
+    return {'benchmark': 'startup', 'runs': runs, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless benchmarks of the draughts AI')
+    parser.add_argument('--output', default=None, help='JSON file where the results are also written')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    parallel = subparsers.add_parser('parallel', help='speedup of the parallel root search versus the core count')
+    parallel.add_argument('--depth', type=int, default=4)
+    parallel.add_argument('--difficulty', type=int, default=3)
+    parallel.add_argument('--positions', type=int, default=6)
+    parallel.add_argument('--workers', type=int, default=None, help='maximum number of workers (default: cores)')
+
+    batch = subparsers.add_parser('batch', help='throughput of the vectorized evaluation versus the scalar one')
+    batch.add_argument('--positions', type=int, default=2000)
+
+    expansion = subparsers.add_parser('expansion', help='memory and moves generated by the lazy and eager expansions')
+    expansion.add_argument('--depth', type=int, default=6)
+    expansion.add_argument('--difficulty', type=int, default=3)
+    expansion.add_argument('--positions', type=int, default=10)
+
+    search = subparsers.add_parser('search', help='nodes and time to depth of each search technique')
+    search.add_argument('--depth', type=int, default=7)
+    search.add_argument('--difficulty', type=int, default=3)
+    search.add_argument('--positions', type=int, default=12)
+
+    stats = subparsers.add_parser('stats', help='cost of the search statistics (timing and tracing)')
+    stats.add_argument('--depth', type=int, default=7)
+    stats.add_argument('--difficulty', type=int, default=3)
+    stats.add_argument('--positions', type=int, default=12)
+    stats.add_argument('--trace', default=None, help='JSON lines file where the traced searches are appended')
+
+    render = subparsers.add_parser('render', help='time per frame of the full and dirty rect rendering')
+    render.add_argument('--frames', type=int, default=600)
+
+    idle = subparsers.add_parser('idle', help='CPU usage of the fixed frame rate and event-driven game loops')
+    idle.add_argument('--seconds', type=float, default=5.0)
+
+    startup = subparsers.add_parser('startup', help='time from import to the first frame of the main menu')
+    startup.add_argument('--runs', type=int, default=5)
+
+    perft_parser = subparsers.add_parser('perft', help='move generator counts (checked) and speed')
+    perft_parser.add_argument('--depth', type=int, default=6)
+
+    difficulty = subparsers.add_parser('difficulty', help='fixed-depth search time at each difficulty')
+    difficulty.add_argument('--depth', type=int, default=8)
+
+    args = parser.parse_args()
+    if args.benchmark == 'parallel':
+        result = bench_parallel(args.depth, args.difficulty, args.positions, args.workers)
+    elif args.benchmark == 'batch':
+        result = bench_batch(args.positions)
+    elif args.benchmark == 'expansion':
+        result = bench_expansion(args.depth, args.difficulty, args.positions)
+    elif args.benchmark == 'search':
+        result = bench_search(args.depth, args.difficulty, args.positions)
+    elif args.benchmark == 'stats':
+        result = bench_stats(args.depth, args.difficulty, args.positions, args.trace)
+    elif args.benchmark == 'render':
+        result = bench_render(args.frames)
+    elif args.benchmark == 'idle':
+        result = bench_idle(args.seconds)
+    elif args.benchmark == 'startup':
+        result = bench_startup(args.runs)
+    elif args.benchmark == 'perft':
+        result = bench_perft(args.depth)
+    elif args.benchmark == 'difficulty':
+        result = bench_difficulty(args.depth)
+    print(json.dumps(result, indent=2))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    # A wrong perft count (or a parallel search that differs from the serial one) is reported with the exit status, so
+    # that it can be checked by a script
+    if not result.get('ok', True):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
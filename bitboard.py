@@ -0,0 +1,349 @@
+from game_constants import WHITE, BLACK, ROWS, COLS
+from board import Board
+from piece import Piece
+from zobrist import board_hash
+
+"""
+.py file with a compact bitboard representation of a board position. Only the 32 dark squares of the board can hold a
+piece, so each of them is mapped to one bit (square = row * 4 + col // 2) and a position is stored as three integers:
+the black pieces, the white pieces and the kings (of both colors)
+"""
+
+# Number of playable squares and the mask with all of them set
+SQUARES = ROWS * COLS // 2
+FULL = (1 << SQUARES) - 1
+
+# Diagonal directions as (row step, column step). White men move downwards (+1) and black men move upwards (-1), while
+# kings can move in the four directions
+DIRECTIONS = ((1, -1), (1, 1), (-1, -1), (-1, 1))
+FORWARD = {WHITE: (0, 1), BLACK: (2, 3)}
+ALL_DIRECTIONS = (0, 1, 2, 3)
+
+# Row and column of each square, and the square of each dark (row, column) pair
+ROW_OF = [sq // 4 for sq in range(SQUARES)]
+COL_OF = [2 * (sq % 4) + (1 - (sq // 4) % 2) for sq in range(SQUARES)]
+
+
+def square(row, col):
+    """
+    Get the square index of a given row and column (None if it is not a playable square)
+    """
+    if 0 <= row < ROWS and 0 <= col < COLS and (row + col) % 2 == 1:
+        return row * 4 + col // 2
+    return None
+
+
+def bit_squares(bits):
+    """
+    Yields the index of each square set in a bitboard, from the top-left to the bottom-right square
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+# STEP[sq][d] is the square reached moving one step from 'sq' in direction 'd', and JUMP[sq][d] is the square reached
+# after jumping over STEP[sq][d]. A value of None means that the move leaves the board
+STEP = [[square(ROW_OF[sq] + dr, COL_OF[sq] + dc) for dr, dc in DIRECTIONS] for sq in range(SQUARES)]
+JUMP = [[square(ROW_OF[sq] + 2 * dr, COL_OF[sq] + 2 * dc) for dr, dc in DIRECTIONS] for sq in range(SQUARES)]
+
+# Mask of each row and of the king's row of each color (the last row reached by the men of that color)
+ROW_MASK = [sum(1 << sq for sq in range(SQUARES) if ROW_OF[sq] == row) for row in range(ROWS)]
+KING_ROW = {WHITE: ROW_MASK[ROWS - 1], BLACK: ROW_MASK[0]}
+
+
+def _build_shifts():
+    """
+    For each direction, it is built a list of (mask, offset) pairs such that shifting the squares in 'mask' by 'offset'
+    moves every piece one step in that direction. Even and odd rows have different offsets, and squares whose step
+    leaves the board are excluded from the masks
+    """
+    shifts = []
+    for d in ALL_DIRECTIONS:
+        by_offset = {}
+        for sq in range(SQUARES):
+            if STEP[sq][d] is not None:
+                offset = STEP[sq][d] - sq
+                by_offset[offset] = by_offset.get(offset, 0) | (1 << sq)
+        shifts.append([(mask, offset) for offset, mask in by_offset.items()])
+    return shifts
+
+
+SHIFTS = _build_shifts()
+
+
+def shift(bits, d):
+    """
+    Moves every square of a bitboard one step in direction 'd' (squares that would leave the board are dropped)
+    """
+    result = 0
+    for mask, offset in SHIFTS[d]:
+        if offset > 0:
+            result |= (bits & mask) << offset
+        else:
+            result |= (bits & mask) >> -offset
+    return result
+
+
+class BitBoard:
+    """
+    BitBoard class that stores a position as three integers and implements the game rules of the Board class with
+    bitwise operations. It is meant for the search (positions are cheap to copy, compare and hash) and it can be
+    converted to and from a Board so that the pygame interface keeps working with the Board class
+    """
+    def __init__(self, black=0, white=0, kings=0):
+        self.black = black
+        self.white = white
+        self.kings = kings
+
+    @classmethod
+    def initial(cls):
+        """
+        Position at the start of the game (same as Board.create_board)
+        """
+        return cls(black=FULL & ~((1 << 20) - 1), white=(1 << 12) - 1, kings=0)
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Builds a bitboard from the pieces of a Board object
+        """
+        black = white = kings = 0
+        for row in board.board:
+            for piece in row:
+                if piece != 0:
+                    bit = 1 << square(piece.row, piece.col)
+                    if piece.color == BLACK:
+                        black |= bit
+                    else:
+                        white |= bit
+                    if piece.king:
+                        kings |= bit
+        return cls(black, white, kings)
+
+    def to_board(self):
+        """
+        Builds a Board object (with its Piece objects and piece counters) from the current bitboard
+        """
+        board = Board()
+        board.board = [[0] * COLS for _ in range(ROWS)]
+        for color, bits in ((BLACK, self.black), (WHITE, self.white)):
+            for sq in bit_squares(bits):
+                piece = Piece(ROW_OF[sq], COL_OF[sq], color)
+                if self.kings >> sq & 1:
+                    piece.make_king()
+                board.board[ROW_OF[sq]][COL_OF[sq]] = piece
+        board.black_left, board.white_left = self.count(BLACK), self.count(WHITE)
+        board.black_kings, board.white_kings = self.king_count(BLACK), self.king_count(WHITE)
+        board.hash = board_hash(board.board)
+        board.reset_evaluation()
+        return board
+
+    def key(self):
+        """
+        Tuple that identifies the position
+        """
+        return self.black, self.white, self.kings
+
+    def __eq__(self, other):
+        return isinstance(other, BitBoard) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def copy(self):
+        return BitBoard(self.black, self.white, self.kings)
+
+    def pieces(self, color):
+        """
+        Bitboard with the pieces of a given color
+        """
+        return self.black if color == BLACK else self.white
+
+    def count(self, color):
+        """
+        Number of pieces of a given color (equivalent to Board.black_left/white_left)
+        """
+        return self.pieces(color).bit_count()
+
+    def king_count(self, color):
+        """
+        Number of kings of a given color (equivalent to Board.black_kings/white_kings)
+        """
+        return (self.pieces(color) & self.kings).bit_count()
+
+    def empty(self):
+        """
+        Bitboard with the empty squares
+        """
+        return FULL & ~(self.black | self.white)
+
+    def _movers(self, color, d):
+        """
+        Pieces of a given color that are allowed to move in direction 'd' (men only move forward)
+        """
+        own = self.pieces(color)
+        if d in FORWARD[color]:
+            return own
+        return own & self.kings
+
+    def capture_squares(self, color):
+        """
+        Bitboard with the pieces of a given color that have a jump available. It is computed for the whole side at once
+        by shifting the pieces twice along each direction
+        """
+        opponent = self.pieces(WHITE if color == BLACK else BLACK)
+        empty = self.empty()
+        opposite = (3, 2, 1, 0)
+        jumpers = 0
+        for d in ALL_DIRECTIONS:
+            landings = shift(shift(self._movers(color, d), d) & opponent, d) & empty
+            if landings:
+                jumpers |= shift(shift(landings, opposite[d]), opposite[d])
+        return jumpers
+
+    def has_captures(self, color):
+        """
+        Checks whether a given color has any jump available (i.e., whether the mandatory jump rule applies)
+        """
+        return self.capture_squares(color) != 0
+
+    def has_moves(self, color):
+        """
+        Checks whether a given color has any legal move
+        """
+        empty = self.empty()
+        for d in ALL_DIRECTIONS:
+            if shift(self._movers(color, d), d) & empty:
+                return True
+        return self.has_captures(color)
+
+    def get_moves(self, color):
+        """
+        Returns every legal move of a given color. A move is a tuple (path, captured), where 'path' is the list of
+        squares visited by the piece (starting square first) and 'captured' the squares of the jumped pieces. As in the
+        Board class, jumps are mandatory and a multi-jump ends when the piece is crowned. Jump sequences that lead to
+        the same position are only returned once (see 'capture_sequences')
+        """
+        moves = []
+        jumpers = self.capture_squares(color)
+        if jumpers:
+            for sq in bit_squares(jumpers):
+                moves.extend(self.capture_sequences(color, sq))
+            return moves
+
+        empty = self.empty()
+        own = self.pieces(color)
+        for sq in bit_squares(own):
+            directions = ALL_DIRECTIONS if self.kings >> sq & 1 else FORWARD[color]
+            for d in directions:
+                target = STEP[sq][d]
+                if target is not None and empty >> target & 1:
+                    moves.append(((sq, target), ()))
+        return moves
+
+    def capture_sequences(self, color, sq):
+        """
+        Returns every distinct jump sequence of the piece in 'sq' as (path, captured) moves. The jump tree is walked on
+        the integers of the position, without building the intermediate positions: the piece leaves its starting
+        square and each captured piece is removed from the opponent's pieces (its square becomes empty). A man that
+        reaches the king's row or jumps over a king is crowned and its sequence ends, as in Game.select, where the turn
+        is over once the piece changes its king status.
+
+        Two sequences that end on the same square after capturing the same pieces (e.g., a king jumping around a group
+        of pieces in both senses) lead to the same position, so only the first one is returned
+        """
+        king = bool(self.kings >> sq & 1)
+        opponent = self.pieces(WHITE if color == BLACK else BLACK)
+        empty = self.empty() | (1 << sq)
+        directions = ALL_DIRECTIONS if king else FORWARD[color]
+        kings, king_row = self.kings, KING_ROW[color]
+        sequences = []
+        seen = set()
+
+        def add(path, captured, captured_bits):
+            if (path[-1], captured_bits) not in seen:
+                seen.add((path[-1], captured_bits))
+                sequences.append((path, captured))
+
+        def follow(current, path, captured, captured_bits):
+            extended = False
+            for d in directions:
+                over, landing = STEP[current][d], JUMP[current][d]
+                if (landing is None or not (opponent & ~captured_bits) >> over & 1 or
+                        not (empty | captured_bits) >> landing & 1):
+                    continue
+                extended = True
+                new_path, new_captured, new_bits = path + (landing,), captured + (over,), captured_bits | 1 << over
+                if not king and (kings >> over & 1 or king_row >> landing & 1):
+                    add(new_path, new_captured, new_bits)
+                else:
+                    follow(landing, new_path, new_captured, new_bits)
+            if not extended and captured:
+                add(path, captured, captured_bits)
+
+        follow(sq, (sq,), (), 0)
+        return sequences
+
+    def apply(self, move, color):
+        """
+        Returns the position reached after a given move of a given color. A man is crowned when it reaches the king's
+        row or when it jumps over a king (same rules as Board.move and Board.remove_piece)
+        """
+        path, captured = move
+        start, end = path[0], path[-1]
+        black, white, kings = self.black, self.white, self.kings
+        start_bit, end_bit = 1 << start, 1 << end
+
+        captured_bits = 0
+        for sq in captured:
+            captured_bits |= 1 << sq
+
+        was_king = kings & start_bit
+        crowned = was_king or (captured_bits & kings) or (end_bit & KING_ROW[color])
+        kings &= ~(start_bit | captured_bits)
+        if crowned:
+            kings |= end_bit
+
+        if color == BLACK:
+            black = (black & ~start_bit) | end_bit
+            white &= ~captured_bits
+        else:
+            white = (white & ~start_bit) | end_bit
+            black &= ~captured_bits
+
+        return BitBoard(black, white, kings)
+
+    def game_state(self):
+        """
+        Same as Board.game_state: the game ends when a player has no pieces or no available moves
+        """
+        if not self.white or not self.has_moves(WHITE):
+            return True, 'Black'
+        if not self.black or not self.has_moves(BLACK):
+            return True, 'White'
+        return False, None
+
+    def heuristics(self, difficulty):
+        """
+        Same heuristics as Board.heuristics, computed from population counts. In the hard mode the value of a man only
+        depends on its row, so the men of each row are counted at once
+        """
+        black_left, white_left = self.count(BLACK), self.count(WHITE)
+        black_kings, white_kings = self.king_count(BLACK), self.king_count(WHITE)
+        if difficulty == 1:
+            return black_left - white_left
+
+        elif difficulty == 2:
+            return black_left - white_left + (black_kings - white_kings) * 1.5
+
+        # A black man in row r is worth (14 - r) / 7 and a white man -(r + 7) / 7 (see Board.evaluate_position), so
+        # the numerator is accumulated as an integer and divided once
+        d = ROWS - 1
+        black_men, white_men = self.black & ~self.kings, self.white & ~self.kings
+        numerator = 0
+        for row in range(ROWS):
+            numerator += (2 * d - row) * (black_men & ROW_MASK[row]).bit_count()
+            numerator -= (row + d) * (white_men & ROW_MASK[row]).bit_count()
+        return numerator / d + (black_kings - white_kings) * 2
@@ -1,19 +1,66 @@
-import pygame
-from game_constants import WHITISH, BROWN, WHITE, BLACK, ROWS, COLS, SQUARE_SIZE
+from game_constants import WHITE, BLACK, ROWS, COLS
 from piece import Piece
+from zobrist import piece_key, board_hash
+
+# Hard heuristic tables: value of a man of each color in each row multiplied by D (see 'position_points') and value of
+# a king. They are used to update the evaluation incrementally when a piece is moved, removed or crowned
+D = ROWS - 1
+KING_POINTS = 2
+MEN_POINTS = {BLACK: [abs(row - D) + D for row in range(ROWS)], WHITE: [- row - D for row in range(ROWS)]}
+
+# Diagonal steps (row, column) of the men of each color (white men move down and black men up), of the kings and row
+# where the men of each color are crowned
+FORWARD = {WHITE: ((1, -1), (1, 1)), BLACK: ((-1, -1), (-1, 1))}
+DIRECTIONS = FORWARD[WHITE] + FORWARD[BLACK]
+KING_ROW = {WHITE: ROWS - 1, BLACK: 0}
+
+# Maximum number of positions whose moves are kept by the move cache of a board
+MOVE_CACHE_SIZE = 4096
 
 
 class Board:
     """
-    Board class to draw and modify the game board based on the moves selected by the player/AI
+    Board class to modify the game board based on the moves selected by the player/AI. It does not depend on pygame:
+    the board is drawn by the render module
     """
+    # If True, every evaluation is checked against the evaluation computed from scratch
+    debug_evaluation = False
+
     def __init__(self):
         self.board = []
         self.winner = None
         self.black_left = self.white_left = 12
         self.black_kings = self.white_kings = 0
+        # Zobrist hash of the position, updated incrementally by 'move' and 'remove_piece'
+        self.hash = 0
+        # Running hard-mode evaluation: points of the men (multiplied by D) and of the kings, updated by 'move' and
+        # 'remove_piece'. The other heuristics only need the piece counters
+        self.men_points = 0
+        self.king_points = 0
+        # Moves of the positions generated recently: (hash, color) -> list of ((row, col), path) moves. They are stored
+        # by square since the same position can be reached with different Piece objects in each square
+        self.move_cache = {}
         self.create_board()
 
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        """
+        Two boards are equal if they have the same pieces (color and king status) in the same squares
+        """
+        if not isinstance(other, Board) or self.hash != other.hash:
+            return False
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece, other_piece = self.board[row][col], other.board[row][col]
+                if piece == 0 or other_piece == 0:
+                    if piece != other_piece:
+                        return False
+                elif piece.color != other_piece.color or piece.king != other_piece.king:
+                    return False
+        return True
+
     def create_board(self):
         """
         Creates the pieces of each color in its initial positions. A zero indicates that it is an empty square. Each
@@ -27,26 +74,27 @@ class Board:
                       [Piece(5, 0, BLACK), 0, Piece(5, 2, BLACK), 0, Piece(5, 4, BLACK), 0, Piece(5, 6, BLACK), 0],
                       [0, Piece(6, 1, BLACK), 0, Piece(6, 3, BLACK), 0, Piece(6, 5, BLACK), 0, Piece(6, 7, BLACK)],
                       [Piece(7, 0, BLACK), 0, Piece(7, 2, BLACK), 0, Piece(7, 4, BLACK), 0, Piece(7, 6, BLACK), 0]]
+        self.hash = board_hash(self.board)
+        self.reset_evaluation()
 
-    def draw(self, win):
+    def reset_evaluation(self):
         """
-        Draw each piece by calling the draw method from the Piece class
+        Computes the running evaluation from scratch
         """
-        self.draw_squares(win)
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
+        self.men_points = self.king_points = 0
+        for row in self.board:
+            for piece in row:
                 if piece != 0:
-                    piece.draw(win)
+                    self.update_evaluation(piece, 1)
 
-    def draw_squares(self, win):
+    def update_evaluation(self, piece, sign):
         """
-        Draw squares
+        Adds (sign = 1) or subtracts (sign = -1) the value of a piece in its current square to the running evaluation
         """
-        win.fill(BROWN)
-        for row in range(ROWS):
-            for col in range(row % 2, ROWS, 2):
-                pygame.draw.rect(win, WHITISH, (row * SQUARE_SIZE, col * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        if piece.king:
+            self.king_points += sign * KING_POINTS if piece.color == BLACK else - sign * KING_POINTS
+        else:
+            self.men_points += sign * MEN_POINTS[piece.color][piece.row]
 
     def get_piece(self, row, col):
         """
@@ -58,46 +106,83 @@ class Board:
         """
         Function called by the heuristic function to compute the value of a piece depending on its current row position
         """
+        return self.position_points(piece, d) / d
+
+    def position_points(self, piece, d):
+        """
+        Value of a piece in its current row multiplied by 'd' (an integer), so that the heuristic can add the values of
+        all the pieces exactly and divide only once
+        """
         if piece.color == BLACK:
-            return abs(piece.row - d) / d + 1
+            return abs(piece.row - d) + d
         else:
-            return - piece.row / d - 1
-
+            return - piece.row - d
 
     def heuristics(self, difficulty):
         """
-        Different heuristics are evaulated depending on the game difficulty selected
+        Different heuristics are evaulated depending on the game difficulty selected. They are computed in constant time
+        from the piece counters and the running evaluation
+        """
+        if difficulty == 1:
+            evaluation = self.black_left - self.white_left
+        elif difficulty == 2:
+            evaluation = self.black_left - self.white_left + (self.black_kings - self.white_kings) * 1.5
+        else:
+            evaluation = self.men_points / D + self.king_points
+
+        if self.debug_evaluation and evaluation != self.full_heuristics(difficulty):
+            raise RuntimeError('Incremental evaluation {} differs from the full evaluation {}'.format(
+                evaluation, self.full_heuristics(difficulty)))
+        return evaluation
+
+    def full_heuristics(self, difficulty):
+        """
+        Heuristics computed from scratch by looping over the board (the piece counters are also recomputed)
         """
+        black_left = white_left = black_kings = white_kings = 0
+        for row in self.board:
+            for piece in row:
+                if piece != 0:
+                    if piece.color == BLACK:
+                        black_left += 1
+                        black_kings += piece.king
+                    else:
+                        white_left += 1
+                        white_kings += piece.king
+
         # For the easiest mode (1), the heuristic is just subtracting the black pieces to the white pieces
         if difficulty == 1:
-            return self.black_left - self.white_left
+            return black_left - white_left
 
         # In the medium difficulty, the heuristic is the same, except that the kings are also taken into account. In
         # particular, a king's value is 1.5 times a regular piece
         elif difficulty == 2:
-            return self.black_left - self.white_left + (self.black_kings - self.white_kings) * 1.5
+            return black_left - white_left + (black_kings - white_kings) * 1.5
 
         # Finally, in the hard mode, the heuristic is a bit more complex. It takes into account the row position of
         # each piece. The closer to the top/bottom row, the higher is its value. However, a king always has the same
         # value, which is double than a regular piece. By doing this, the AI tends to move to put more pressure on its
         # opponent because a piece value increases linearly.
         elif difficulty == 3:
-            d = 7
-            king_points = 2
+            d = D
+            king_points = KING_POINTS
 
-        evaluation = 0
+        # The values of the men are added as integers (see 'position_points') and divided at the end, so that the result
+        # does not depend on the order of the sum (e.g., it is the same as the one of the vectorized evaluation)
+        points = 0
+        kings = 0
         for row in self.board:
             for piece in row:
                 if piece != 0:
                     if not piece.king:
-                        evaluation += self.evaluate_position(piece, d)
+                        points += self.position_points(piece, d)
                     elif piece.king:
                         if piece.color == BLACK:
-                            evaluation += king_points
+                            kings += king_points
                         else:
-                            evaluation -= king_points
+                            kings -= king_points
 
-        return evaluation
+        return points / d + kings
 
     def game_state(self, printed=False):
         """
@@ -119,6 +204,17 @@ class Board:
 
         return False, self.winner
 
+    def search_state(self, color):
+        """
+        Game state and moves of the player to move at once, as (end game, winner, moves), so that a search node only
+        generates its moves once. The result is the same as the one of 'game_state', where each player is only checked
+        until its first move is found, and the moves are a lazy iterator (see 'iter_side_moves') that generates them
+        while the search asks for the next one
+        """
+        moves = self.iter_side_moves(color, unique=True)
+        end_game, winner = self.game_state()
+        return end_game, winner, moves
+
     def get_all_pieces(self, color):
         """
         Returns all the pieces of a given color
@@ -137,6 +233,8 @@ class Board:
         # Replace value of the board where the piece was with a zero and the board value where the piece is moved (row
         # and column inputs) with the piece object that has been moved (piece.row and piece.col)
         self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
+        self.hash ^= piece_key(piece.row, piece.col, piece.color, piece.king)
+        self.update_evaluation(piece, -1)
         piece.move(row, col)
 
         if piece.color == WHITE and row == ROWS - 1 and not piece.king:
@@ -147,6 +245,8 @@ class Board:
             self.black_kings += 1
         else:
             pass
+        self.hash ^= piece_key(row, col, piece.color, piece.king)
+        self.update_evaluation(piece, 1)
 
     def remove_piece(self, turn, valid_moves, selected, row, col):
         """
@@ -160,7 +260,11 @@ class Board:
                 # If the piece to be removed is a king and the piece that jumps over it is not, then this piece is
                 # converted to king
                 if self.get_piece(erase_row, erase_col).king and not selected.king:
+                    self.hash ^= piece_key(selected.row, selected.col, selected.color, False)
+                    self.update_evaluation(selected, -1)
                     selected.make_king()
+                    self.hash ^= piece_key(selected.row, selected.col, selected.color, True)
+                    self.update_evaluation(selected, 1)
                     # Update the number of black and white kings
                     if turn == WHITE:
                         self.white_kings += 1
@@ -177,6 +281,9 @@ class Board:
                         self.white_kings -= 1
 
                 # Remove piece by setting it to '0'
+                erased = self.board[erase_row][erase_col]
+                self.hash ^= piece_key(erase_row, erase_col, erased.color, erased.king)
+                self.update_evaluation(erased, -1)
                 self.board[erase_row][erase_col] = 0
 
                 # Update the overall number of pieces of each player
@@ -185,178 +292,226 @@ class Board:
                 else:
                     self.white_left -= 1
 
-    def available_moves(self, color):
+    def make_move(self, piece, row, col, valid_moves):
         """
-        Checks whether the current player has any available move
+        Applies a single move (or jump) of a piece in place and returns the information needed by 'unmake_move' to undo
+        it exactly: the piece's previous square and king status, the captured pieces, the piece counters, the hash and
+        the running evaluation
         """
-        available = False
-        for row in self.board:
-            for piece in row:
-                if piece != 0 and piece.color == color:
-                    valid_moves = self.get_valid_moves(piece)
-                    if valid_moves[0]:
-                        available = True
-        return available
+        erase = valid_moves[1].get((row, col), [])
+        captured = [self.get_piece(erase_row, erase_col) for (erase_row, erase_col) in erase]
+        undo = (piece, piece.row, piece.col, piece.king, captured, self.winner, self.hash,
+                (self.black_left, self.white_left, self.black_kings, self.white_kings, self.men_points,
+                 self.king_points))
+        # The turn is always the color of the moving piece, so that the counters of the right player are updated
+        self.remove_piece(piece.color, valid_moves, piece, row, col)
+        self.move(piece, row, col)
+        return undo
 
-    def get_valid_moves(self, piece):
+    def unmake_move(self, undo):
         """
-        Given a piece, it returns all the valid moves
-        """
-        # Get the pieces of the current player with available jumps
-        available_jumps = self.available_jumps(piece.color)
-        if available_jumps:
-            if piece in available_jumps:
-                # If there are available jumps and the current piece has available jumps, then its valid moves (if any)
-                # are returned. This is to comply with the mandatory jump rule which states that a player must make a
-                # jump if there is any available (i.e., mandatory jump)
-                return self.get_moves(piece)
-            elif piece not in available_jumps:
-                # If there are available jumps but the given piece does not have, then an empty list and an empty
-                # dictionary are returned, meaning that there are no moves for this piece
-                return [], {}
-        else:
-            # If there are no available jumps, then the valid moves of the current piece (if any) are returned
-            return self.get_moves(piece)
-
-    def available_jumps(self, color):
-        """
-        Check whether there are available jumps for each piece of the current player
+        Undoes a move made by 'make_move', restoring the captured pieces, king promotions, piece counters and hash
         """
-        jumps = []
-        for piece in self.get_all_pieces(color):
-            moves = self.get_moves(piece)
-            if moves[1]:
-                jumps.append(piece)
-
-        return jumps
+        piece, row, col, king, captured, winner, position_hash, counters = undo
+        self.board[piece.row][piece.col], self.board[row][col] = 0, piece
+        piece.move(row, col)
+        piece.king = king
+        for captured_piece in captured:
+            self.board[captured_piece.row][captured_piece.col] = captured_piece
+        self.winner = winner
+        self.hash = position_hash
+        (self.black_left, self.white_left, self.black_kings, self.white_kings, self.men_points,
+         self.king_points) = counters
 
-    def get_moves(self, piece):
+    def available_moves(self, color):
         """
-        Get valid moves for a given piece
+        Checks whether the current player has any available move. The moves are not generated: the pieces are checked
+        until one of them can move or jump to an adjacent square
         """
-        # Dictionary to store each valid move as keys, and as values each jumped opponents piece (if any)
-        eaten = {}
-        # Store valid moves
-        total_moves = []
-
-        # In both conditions the logic is the same. Given a location (row and column) of a piece and its color
-        # it is searched if there is any available move (diagonally left/right and up/down depending on the color a
-        # and whether it is a king or not). In the 'moves' list it is stored all available moves, and in the
-        # 'jumped' list it is stored all the jumped pieces of the opponent. If the given piece is a king, it will be
-        # searched any available movement on its left/right in both directions (up/down or, which is the same, 1/-1)
-        if piece.color == WHITE or piece.king:
-            total_moves_l = self.go_left(piece.row, piece.col, 1, eaten, piece, moves=[], jumped=[], previous=False)
-            total_moves_r = self.go_right(piece.row, piece.col, 1, eaten, piece, moves=[], jumped=[], previous=False)
-            total_moves += total_moves_l + total_moves_r
-
-        if piece.color == BLACK or piece.king:
-            total_moves_l = self.go_left(piece.row, piece.col, -1, eaten, piece, moves=[], jumped=[], previous=False)
-            total_moves_r = self.go_right(piece.row, piece.col, -1, eaten, piece, moves=[], jumped=[], previous=False)
-            total_moves += total_moves_l + total_moves_r
-
-        # Store only the jump movements if the piece has any available
-        if list(eaten.keys()):
-            filtered_total_moves = [move for move in total_moves if move in list(eaten.keys())]
-        else:
-            filtered_total_moves = total_moves
-
-        # Since 'None' is returned when there are no available movements in some direction (left/right), these are
-        # are filtered from the total available moves list
-        filtered_total_moves = [move for move in filtered_total_moves if move is not None]
-
-        return filtered_total_moves, eaten
-
-    def go_left(self, row, col, direction, eaten, piece, moves, jumped, previous):
-        """
-        Function that recursively searches along the left direction of a given piece. Several conditions are imposed
-        to determine whether there is any available movement when moving leftwards
-        """
-        # Next row and column to explore. Depending on the color of the piece or whether it is a king or not, it will
-        # explored the up-left squares and/or the down-left squares
-        next_row = row + direction
-        next_col = col - 1
-
-        # If the next square to explore is within the board limits, then it is a valid square to explore a possible move
-        if 0 <= next_row < ROWS and next_col >= 0 and next_col < COLS:
-            # Get current piece
-            current_piece = self.get_piece(row, col)
-            # Get the piece of the square that is going to be explore
-            next_piece = self.get_piece(next_row, next_col)
-
-            # If the next square is empty and there has not been any previous jump, it is appended as a possible move
-            if next_piece == 0 and not moves and not previous:
-                moves.append((next_row, next_col))
-                return moves
-
-            # If in the next square there is an opponent's piece, a recursive call is made to explore further along
-            # the left direction
-            elif next_piece != 0 and next_piece.color != piece.color and not previous:
-                self.go_left(next_row, next_col, direction, eaten, piece, moves, jumped, previous=True)
-                return moves
-
-            # If next square is empty and there has been a jump, it is appended as a possible move and also the piece
-            # that has been captured
-            elif next_piece == 0 and previous:
-                jumped.append((row, col))
-                eaten[(next_row, next_col)] = jumped.copy()
-                moves.append((next_row, next_col))
-                if not piece.king and current_piece.king:
-                    return moves
-
-            # If there is any available move it is returned the list with the moves
-            elif moves:
-                return moves
-
-            # If there are no available moves, it is returned '[None]'
-            else:
-                return [None]
-
-        # If the next square is out of the board bounds, then it is returned the moves appended
-        elif moves:
-            return moves
-
-        # If the next square is out of bounds but no previous move has been appended, it is returned '[None]'
-        else:
-            return [None]
+        for row in self.board:
+            for piece in row:
+                if piece != 0 and piece.color == color:
+                    if self.can_jump(piece):
+                        return True
+                    for row_step, col_step in (DIRECTIONS if piece.king else FORWARD[color]):
+                        next_row, next_col = piece.row + row_step, piece.col + col_step
+                        if 0 <= next_row < ROWS and 0 <= next_col < COLS and self.board[next_row][next_col] == 0:
+                            return True
+        return False
+
+    def can_jump(self, piece):
+        """
+        Checks whether a piece can jump over an adjacent opponent's piece
+        """
+        for row_step, col_step in (DIRECTIONS if piece.king else FORWARD[piece.color]):
+            jump_row, jump_col = piece.row + 2 * row_step, piece.col + 2 * col_step
+            if 0 <= jump_row < ROWS and 0 <= jump_col < COLS and self.board[jump_row][jump_col] == 0:
+                jumped = self.board[piece.row + row_step][piece.col + col_step]
+                if jumped != 0 and jumped.color != piece.color:
+                    return True
+        return False
+
+    def is_legal(self, move, color):
+        """
+        Checks whether a (piece, path) move is legal for a player without generating every move of the player: a jump
+        sequence has to be one of the sequences of its piece, and a simple move is only legal if no piece can jump
+        """
+        piece, path = move
+        if piece == 0 or piece.color != color:
+            return False
+        if abs(path[0][0] - piece.row) == 2:
+            jumps = []
+            self.get_jumps(piece, jumps)
+            return move in jumps
+        (row, col), = path
+        if (row - piece.row, col - piece.col) not in (DIRECTIONS if piece.king else FORWARD[color]):
+            return False
+        if self.board[row][col] != 0:
+            return False
+        return not self.has_jumps(color)
+
+    def has_jumps(self, color):
+        """
+        Checks whether any piece of a player can jump (i.e., whether the player has to make a jump)
+        """
+        for row in self.board:
+            for piece in row:
+                if piece != 0 and piece.color == color and self.can_jump(piece):
+                    return True
+        return False
 
-    def go_right(self, row, col, direction, eaten, piece, moves, jumped, previous=False):
+    def get_side_moves(self, color, unique=False):
         """
-        Function that recursively searches along the right direction of a given piece. Several conditions are imposed
-        to determine whether there is any available movement when moving rightwards. Note that this function has exactly
-        the same structure as the 'go_left' function. Thus, the same comments made above apply here (just taking into
-        account that the direction searched here is right instead of left)
+        Returns the list of every legal move of a player (see 'iter_side_moves')
         """
-        next_row = row + direction
-        next_col = col + 1
+        return list(self.iter_side_moves(color, unique))
 
-        if 0 <= next_row < ROWS and next_col >= 0 and next_col < COLS:
-            current_piece = self.get_piece(row, col)
-            next_piece = self.get_piece(next_row, next_col)
+    def iter_side_moves(self, color, unique=False):
+        """
+        Generates every legal move of a player. Each move is a (piece, path) record, where 'path' is the tuple of
+        squares visited by the piece (more than one square for multiple jumps). The jump rule is enforced for the whole
+        side: the jump sequences of each piece are generated first and, only if there is none, the simple moves.
 
-            # previous piece visited is not empty (i.e., we have encountered a piece form opponent before)
-            if next_piece == 0 and not moves and not previous:
-                moves.append((next_row, next_col))
-                return moves
+        The moves are produced lazily, so a search that cuts off after the first moves does not generate the rest. The
+        board can be changed between moves as long as it is restored (make and unmake) before asking for the next one.
+        Once every move has been generated, they are kept in the move cache.
 
-            elif next_piece != 0 and next_piece.color != piece.color and not previous:
-                self.go_right(next_row, next_col, direction, eaten, piece, moves, jumped, previous=True)
-                return moves
+        If 'unique' is True, the jump sequences of a piece that lead to the same position are only generated once (the
+        search does not need to explore them twice, while the player can choose any of them)
+        """
+        key = (self.hash, color, unique)
+        cached = self.move_cache.get(key)
+        if cached is not None:
+            for (row, col), path in cached:
+                yield self.board[row][col], path
+            return
 
-            elif next_piece == 0 and previous:
-                jumped.append((row, col))
-                eaten[(next_row, next_col)] = jumped.copy()
-                moves.append((next_row, next_col))
-                if not piece.king and current_piece.king:
-                    return moves
+        generated = []
+        for piece, path in self.generate_side_moves(color, unique):
+            generated.append(((piece.row, piece.col), path))
+            yield piece, path
+        if len(self.move_cache) >= MOVE_CACHE_SIZE:
+            self.move_cache.clear()
+        self.move_cache[key] = generated
 
-            elif moves:
-                return moves
+    def generate_side_moves(self, color, unique=False):
+        """
+        Generates the moves of 'iter_side_moves' without the move cache. The jump sequences of a piece are computed
+        together (the grid is changed while they are explored) and the simple moves one by one
+        """
+        jumped = False
+        for row in self.board:
+            for piece in row:
+                if piece != 0 and piece.color == color:
+                    jumps = []
+                    self.get_jumps(piece, jumps, unique)
+                    if jumps:
+                        jumped = True
+                        yield from jumps
+        if jumped:
+            return
 
-            else:
-                return [None]
+        for row in self.board:
+            for piece in row:
+                if piece != 0 and piece.color == color:
+                    for row_step, col_step in (DIRECTIONS if piece.king else FORWARD[color]):
+                        next_row, next_col = piece.row + row_step, piece.col + col_step
+                        if 0 <= next_row < ROWS and 0 <= next_col < COLS and self.board[next_row][next_col] == 0:
+                            yield piece, ((next_row, next_col),)
+
+    def get_jumps(self, piece, moves, unique=False):
+        """
+        Appends every complete jump sequence of a piece to 'moves'. The hops are only simulated on the grid: the piece
+        is lifted from its square and each jumped piece is lifted while the sequence is explored, and they are put back
+        afterwards. If 'unique' is True, only the first sequence that ends on each square with each set of captured
+        pieces is kept
+        """
+        first = len(moves)
+        self.board[piece.row][piece.col] = 0
+        self.continue_jumps(piece, piece.row, piece.col, (), moves)
+        self.board[piece.row][piece.col] = piece
+
+        if unique and len(moves) - first > 1:
+            seen = set()
+            kept = []
+            for move in moves[first:]:
+                key = (move[1][-1], frozenset(self.captured_squares(piece.row, piece.col, move[1])))
+                if key not in seen:
+                    seen.add(key)
+                    kept.append(move)
+            moves[first:] = kept
+
+    def captured_squares(self, row, col, path):
+        """
+        Squares of the pieces captured by a path that starts in a given square (each hop of two rows jumps over the
+        square in between)
+        """
+        captured = []
+        for next_row, next_col in path:
+            if abs(next_row - row) == 2:
+                captured.append(((row + next_row) // 2, (col + next_col) // 2))
+            row, col = next_row, next_col
+        return captured
+
+    def continue_jumps(self, piece, row, col, path, moves):
+        """
+        Explores the jumps of a piece from a given square and returns whether there was any. A sequence ends when the
+        piece has no more jumps or when a man is crowned (by reaching the last row or by capturing a king)
+        """
+        found = False
+        for row_step, col_step in (DIRECTIONS if piece.king else FORWARD[piece.color]):
+            jump_row, jump_col = row + 2 * row_step, col + 2 * col_step
+            if 0 <= jump_row < ROWS and 0 <= jump_col < COLS and self.board[jump_row][jump_col] == 0:
+                jumped = self.board[row + row_step][col + col_step]
+                if jumped != 0 and jumped.color != piece.color:
+                    found = True
+                    hop = path + ((jump_row, jump_col),)
+                    crowned = not piece.king and (jumped.king or jump_row == KING_ROW[piece.color])
+                    self.board[row + row_step][col + col_step] = 0
+                    if crowned or not self.continue_jumps(piece, jump_row, jump_col, hop, moves):
+                        moves.append((piece, hop))
+                    self.board[row + row_step][col + col_step] = jumped
+        return found
 
-        elif moves:
-            return moves
+    def get_valid_moves(self, piece):
+        """
+        Given a piece, it returns all its valid moves (squares of its next hop) and a dictionary with the opponent's
+        piece captured by each jump. They are taken from the moves of the whole side, so that a piece has no moves if
+        another piece of its player can jump (i.e., mandatory jump)
+        """
+        moves = []
+        for move_piece, path in self.get_side_moves(piece.color):
+            if move_piece is piece and path[0] not in moves:
+                moves.append(path[0])
+        return self.hop_moves(piece, moves)
 
-        else:
-            return [None]
+    def hop_moves(self, piece, moves):
+        """
+        Builds the (valid moves, captured pieces) tuple used by 'remove_piece' and 'make_move' for some hops of a
+        piece. A hop of two rows is a jump that captures the piece in between
+        """
+        eaten = {}
+        for row, col in moves:
+            if abs(row - piece.row) == 2:
+                eaten[(row, col)] = [((row + piece.row) // 2, (col + piece.col) // 2)]
+        return moves, eaten
@@ -1,6 +1,8 @@
 import pygame
+import render
+import sprites
 from board import Board
-from game_constants import WHITE, BLACK, BLUE, RED, SQUARE_SIZE, CROWN
+from game_constants import WHITE, BLACK, BLUE, RED, ROWS, COLS, SQUARE_SIZE
 
 
 class Game:
@@ -21,6 +23,16 @@ class Game:
         self.current = None
         self.is_king = False
         self.hint = True
+        # Whether the AI is searching its move, and the font of the message shown meanwhile
+        self.thinking = False
+        self.font = None
+        # Content of each square in the last frame drawn (None to draw the whole window in the next one). If
+        # 'dirty_rendering' is False, the whole window is drawn in every frame
+        self.drawn = None
+        self.dirty_rendering = True
+        # Message shown while the AI is thinking (rendered once) and squares that it covers
+        self.thinking_text = None
+        self.thinking_squares = ()
 
     def reset(self, first_turn, AI_activated, hint):
         """
@@ -39,20 +51,74 @@ class Game:
         self.current = None
         self.is_king = False
         self.hint = hint
+        self.thinking = False
+        self.drawn = None
+
+    def redraw(self):
+        """
+        The whole window is drawn in the next frame (e.g., after a menu has been shown)
+        """
+        self.drawn = None
 
     def update(self):
         """
-        Update the board game information
+        Update the board game information. Only the squares whose content (piece, selection, hint or AI message) has
+        changed since the last frame are drawn, and only their rects of the display are updated
         """
-        self.board.draw(self.win)
-        if self.selected:
-            self.draw_selected_piece()
-            if self.hint:
-                self.draw_valid_moves()
+        squares = self.square_states()
+        if self.drawn is None or not self.dirty_rendering:
+            render.draw_board(self.win, self.board)
+            if self.selected:
+                self.draw_selected_piece()
+                if self.hint:
+                    self.draw_valid_moves()
+            if self.thinking:
+                self.draw_thinking()
+            pygame.display.update()
+        else:
+            rects = []
+            for square, state in squares.items():
+                if self.drawn[square] != state:
+                    rects.append(self.draw_square(square, state))
+            if rects:
+                if self.thinking and self.thinking_rect().collidelist(rects) != -1:
+                    self.draw_thinking()
+                pygame.display.update(rects)
+        self.drawn = squares
         if self.end_game:
             print('GAME FINISHED. WINNER IS {}'.format(self.winner))
 
-        pygame.display.update()
+    def square_states(self):
+        """
+        Content of each square that is drawn: (color, king) of its piece (None if empty) and whether it is selected,
+        highlighted as a valid move or covered by the AI message
+        """
+        selected = (self.selected.row, self.selected.col) if self.selected else None
+        hints = set(move for move in self.valid_moves[0] if move) if self.selected and self.hint else ()
+        if self.thinking:
+            self.thinking_rect()
+        thinking = self.thinking_squares if self.thinking else ()
+        squares = {}
+        for row in range(ROWS):
+            for col in range(COLS):
+                piece = self.board.board[row][col]
+                square = (row, col)
+                squares[square] = (None if piece == 0 else (piece.color, piece.king), square == selected,
+                                   square in hints, square in thinking)
+        return squares
+
+    def draw_square(self, square, state):
+        """
+        Draw a single square with its piece and the highlights of its state. Returns the rect of the square
+        """
+        row, col = square
+        rect = render.draw_square(self.win, self.board, row, col)
+        piece, selected, hint, covered = state
+        if selected:
+            self.draw_selected_piece()
+        elif hint:
+            self.draw_valid_move(row, col)
+        return rect
 
     def select(self, row, col):
         """Given a row and column selected:
@@ -147,13 +213,10 @@ class Game:
         """
         The square of the current selected piece is drawn
         """
-        s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-        s.fill(RED)
-        self.win.blit(s, (self.selected.col * SQUARE_SIZE, self.selected.row * SQUARE_SIZE))
-        radius = SQUARE_SIZE // 2 - self.selected.PADDING
-        pygame.draw.circle(self.win, self.selected.color, (self.selected.x, self.selected.y), radius)
-        if self.selected.king:
-            self.win.blit(CROWN, (self.selected.x - CROWN.get_width() // 2, self.selected.y - CROWN.get_height() // 2))
+        position = (self.selected.col * SQUARE_SIZE, self.selected.row * SQUARE_SIZE)
+        self.win.blit(sprites.overlay(RED), position)
+        # The selected piece is drawn again (without its outline) over the translucent square
+        self.win.blit(sprites.piece(self.selected.color, self.selected.king, outline=False), position)
 
     def draw_valid_moves(self):
         """
@@ -162,10 +225,34 @@ class Game:
         for move in self.valid_moves[0]:
             if move:
                 row, col = move
-                pygame.draw.rect(self.win, WHITE, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-                s = pygame.Surface((SQUARE_SIZE,SQUARE_SIZE), pygame.SRCALPHA)
-                s.fill(BLUE)
-                self.win.blit(s, (col * SQUARE_SIZE, row * SQUARE_SIZE))
+                self.draw_valid_move(row, col)
+
+    def draw_valid_move(self, row, col):
+        """
+        The square of an available movement of the current selected piece is drawn
+        """
+        self.win.blit(sprites.overlay(BLUE), (col * SQUARE_SIZE, row * SQUARE_SIZE))
+
+    def thinking_rect(self):
+        """
+        Rect of the message shown while the AI is searching its move. The message is rendered the first time, along
+        with the squares that it covers
+        """
+        if self.thinking_text is None:
+            if self.font is None:
+                self.font = pygame.font.Font(None, 32)
+            self.thinking_text = self.font.render('AI thinking...', True, WHITE, BLACK)
+            rect = self.thinking_text.get_rect(topleft=(5, 5))
+            self.thinking_squares = {(row, col) for row in range(ROWS) for col in range(COLS) if
+                                     rect.colliderect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)}
+        return self.thinking_text.get_rect(topleft=(5, 5))
+
+    def draw_thinking(self):
+        """
+        Message shown in the top-left corner while the AI is searching its move
+        """
+        rect = self.thinking_rect()
+        self.win.blit(self.thinking_text, rect)
 
     def change_turn(self):
         """
@@ -189,12 +276,15 @@ class Game:
         """
         return self.board
 
-    def AI_turn(self, board):
+    def AI_turn(self, move):
         """
-        Given the board resulting from the move chosen by the AI, it is checked the current state of the game and
-        the turn is changed
+        Given the move chosen by the AI (a (piece, path) tuple), each of its hops is made on the game board. Then, it is
+        checked the current state of the game and the turn is changed
         """
-        self.board = board
+        if move is not None:
+            piece, path = move
+            for row, col in path:
+                self.board.make_move(piece, row, col, self.board.hop_moves(piece, [(row, col)]))
         self.end_game, self.winner = self.board.game_state()
         self.change_turn()
         print('**************************************')
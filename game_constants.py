@@ -1,5 +1,3 @@
-import pygame
-
 """
 .py file where all the game constants are stored
 """
@@ -19,6 +17,10 @@ RED = (255, 100, 0, 130)
 # Valid moves
 BLUE = (0, 100, 255, 130)
 
+# AI search budget for each difficulty (maximum milliseconds per move) and maximum depth of the iterative deepening
+SEARCH_TIME_MS = {1: 100, 2: 300, 3: 1000}
+MAX_SEARCH_DEPTH = 30
+
 # Pieces color
 BLACK = (0, 0, 0)
 WHITE = (250, 250, 250)
@@ -26,5 +28,6 @@ WHITE = (250, 250, 250)
 # Piece edge color
 GREY = (128, 128, 128)
 
-# King's crown image
-CROWN = pygame.transform.scale(pygame.image.load('crown.png'), (30, 30))
\ No newline at end of file
+# King's crown image (loaded by the sprites module) and its size on the board
+CROWN_IMAGE = 'crown.png'
+CROWN_SIZE = (30, 30)
\ No newline at end of file
@@ -1,8 +1,10 @@
+import os
 import pygame
 import pygame_menu
-from game_constants import WIDTH, HEIGHT, SQUARE_SIZE, WHITE, BLACK
+import sprites
+from game_constants import WIDTH, HEIGHT, SQUARE_SIZE, WHITE, BLACK, SEARCH_TIME_MS
 from game import Game
-from AI import AI
+from ai_worker import AIWorker
 
 
 class Main:
@@ -12,18 +14,24 @@ class Main:
         - Pygame initialization and display
         - Function to run the game
     """
-
-    pygame.init()
-    pygame.display.set_caption('Draughts')
-
-    def __init__(self):
+    def __init__(self, start=True, lazy=True):
+        # Pygame is only initialized when the game is created (not when this module is imported)
+        pygame.init()
+        pygame.display.set_caption('Draughts')
         self.FPS = 60
+        # Event-driven mode: instead of drawing FPS frames per second, the game loop sleeps until there is an event (a
+        # click, a key, a finished AI search...) or EVENT_TIMEOUT_MS milliseconds have passed, and then only draws
+        # what has changed
+        self.event_driven = True
+        self.EVENT_TIMEOUT_MS = 500
+        self.AI_EVENT = pygame.event.custom_type()
         self.WIDTH = WIDTH
         self.HEIGHT = HEIGHT
         self.WIN = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
         self.first = BLACK
         self.turn = [('Black', 0), ('White', 1)]
-        self.game = Game(self.WIN, self.first)
+        # The game (board and pieces) is created when the first game starts
+        self.game = None
         self.difficulties = [('Easy', 0), ('Medium', 1), ('Hard', 2)]
         self.difficulty = 1
         self.players = [('1 vs 1', 0), ('1 vs AI', 1)]
@@ -32,14 +40,91 @@ class Main:
         self.hint = True
         self.user_name_1 = 'Default'
         self.user_name_2 = 'Default'
-        self.menus()
+        # Background thread where the AI searches its moves. It posts an event when a search finishes, so that the
+        # event-driven game loop wakes up at once to make the AI move
+        self.ai_worker = AIWorker(notify=lambda: pygame.event.post(pygame.event.Event(self.AI_EVENT)))
+        # AI engine (AI class, tablebase and opening book), loaded by the AI worker while the main menu is shown, and
+        # AI player of each difficulty played
+        self.engine = None
+        self.AI_players = {}
+        # Steps of the start-up made after the main menu is shown, one per frame of the menu loop. If 'lazy' is False,
+        # they are made before the main menu is shown
+        self.lazy = lazy
+        self.pending = []
+        if start:
+            self.menus()
 
     def menus(self):
+        """
+        Shows the main menu and runs it. The rest of the start-up (submenus, sprites and AI engine) is made in the
+        background function of the menu loop, one step per frame
+        """
+        self.show_main_menu()
 
-        global main_menu, game_over_menu
+        # While loop to run main menu
+        while True:
+            # Application events
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    exit()
+
+            # Main menu
+            if main_menu.is_enabled():
+                main_menu.mainloop(self.WIN, self.warm_up)
+
+            # Flip surface
+            pygame.display.flip()
+
+    def new_menu(self, title, theme=pygame_menu.themes.THEME_BLUE):
+        """
+        Empty menu that fills the window (the size and title are given by keyword, since their order changed between
+        versions of pygame_menu)
+        """
+        return pygame_menu.Menu(height=self.HEIGHT, width=self.WIDTH, title=title, theme=theme)
 
-        # Game options menu
-        game_menu = pygame_menu.Menu(self.WIDTH, self.HEIGHT, 'Game options', theme=pygame_menu.themes.THEME_BLUE)
+    def show_main_menu(self):
+        """
+        Creates the main menu and draws its first frame. The submenus are created empty and filled afterwards by
+        'warm_up', along with the sprites and the AI engine, unless the start-up is not lazy
+        """
+        global main_menu
+
+        game_menu = self.new_menu('Game options')
+        rules_menu = self.new_menu('Rules')
+
+        # Main menu
+        main_menu = self.new_menu('Main menu')
+        # Got to game options menu
+        main_menu.add.button('Play', game_menu)
+        # Go to game rules menu
+        main_menu.add.button('Rules', rules_menu)
+        # Quit game
+        main_menu.add.button('Quit', pygame_menu.events.EXIT)
+
+        # The game options are filled first, since 'Play' is the first button, and then the rules (whose long label is
+        # the slowest step)
+        self.pending = [lambda: self.game_menu(game_menu), lambda: self.rules_menu(rules_menu), self.load_engine,
+                        lambda: sprites.load(SQUARE_SIZE)]
+        if not self.lazy:
+            while self.pending:
+                self.warm_up()
+            self.engine.result()
+
+        main_menu.draw(self.WIN)
+        pygame.display.flip()
+
+    def warm_up(self):
+        """
+        Background function of the menu loop: makes the next pending step of the start-up, if any
+        """
+        if self.pending:
+            self.pending.pop(0)()
+
+    def game_menu(self, game_menu):
+        """
+        Fills the game options menu
+        """
         # Select the number of players (1 vs 1 or 1 vs AI)
         game_menu.add.selector('Players: ', self.players, onchange=self.select_players)
         # Choose the name of each player
@@ -54,9 +139,10 @@ class Main:
         # Calls the function that runs the game
         game_menu.add.button('Play', self.run_game, True)
 
-        # Game rules menu
-        rules_menu = pygame_menu.Menu(self.WIDTH, self.HEIGHT, 'Rules', theme=pygame_menu.themes.THEME_BLUE)
-
+    def rules_menu(self, rules_menu):
+        """
+        Fills the game rules menu
+        """
         RULES = """The object is to eliminate all opposing checkers or to create a situation 
 in which it is impossible for your opponent to make any move. Normally, the victory 
 will be due to complete elimination. White moves first and play proceeds alternately. 
@@ -85,37 +171,50 @@ may then use his new king on his next move.
                 """
         rules_menu.add.label(RULES, max_char=-1, font_size=18, font_color='Black')
 
-        # Main menu
-        main_menu = pygame_menu.Menu(self.WIDTH, self.HEIGHT, 'Main menu', theme=pygame_menu.themes.THEME_BLUE)
-        # Got to game options menu
-        main_menu.add.button('Play', game_menu)
-        # Go to game rules menu
-        main_menu.add.button('Rules', rules_menu)
-        # Quit game
-        main_menu.add.button('Quit', pygame_menu.events.EXIT)
-
-        # While loop to run main menu
-        while True:
-            # Application events
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    exit()
-
-            # Main menu
-            if main_menu.is_enabled():
-                main_menu.mainloop(self.WIN)
-
-            # Flip surface
-            pygame.display.flip()
+    def load_engine(self):
+        """
+        Starts loading the AI engine in the background thread of the AI worker
+        """
+        if self.engine is None:
+            self.engine = self.ai_worker.run(self.engine_modules)
 
+    def engine_modules(self):
+        """
+        Imports the AI module and opens the endgame tablebase and the opening book (if they have been generated with
+        tablebase.py and opening_book.py). It runs in the background thread of the AI worker
+        """
+        from AI import AI
+        from tablebase import Tablebase
+        from opening_book import OpeningBook
+        tablebase = Tablebase('tablebase.bin') if os.path.exists('tablebase.bin') else None
+        book = None
+        if os.path.exists('opening_book.bin'):
+            try:
+                book = OpeningBook('opening_book.bin')
+            except ValueError as error:
+                print('Opening book not used:', error)
+        return AI, tablebase, book
+
+    def AI_player(self):
+        """
+        AI of the selected difficulty. It is created the first time that the difficulty is played (waiting for the
+        engine if it is still loading) and reused by the next games, so it keeps its transposition table
+        """
+        if self.difficulty not in self.AI_players:
+            self.load_engine()
+            AI, tablebase, book = self.engine.result()
+            # The opening book is only used by the difficulty it was built for
+            if book is not None and book.difficulty != self.difficulty:
+                book = None
+            self.AI_players[self.difficulty] = AI(self.difficulty, tablebase=tablebase, book=book)
+        return self.AI_players[self.difficulty]
 
     def end_game_menu(self):
         """
         Menu that appears when the game has ended
         """
         # Game over menu
-        game_over_menu = pygame_menu.Menu(self.WIDTH, self.HEIGHT, 'Game over', theme=pygame_menu.themes.THEME_DARK)
+        game_over_menu = self.new_menu('Game over', theme=pygame_menu.themes.THEME_DARK)
 
         # Depending on the game players, print the winner/loser
         if self.game.AI_activated and self.game.winner == 'White':
@@ -144,7 +243,7 @@ may then use his new king on his next move.
         """
         Menu when the game is paused
         """
-        game_pause_menu = pygame_menu.Menu(self.WIDTH, self.HEIGHT, 'Pause', theme=pygame_menu.themes.THEME_BLUE)
+        game_pause_menu = self.new_menu('Pause')
         # Return to game
         game_pause_menu.add.button('Return to game', self.run_game, False)
         # Play again with the same settings
@@ -160,10 +259,10 @@ may then use his new king on his next move.
         """
         if selected[0][0] == 'White':
             self.first = WHITE
-            self.game.turn = WHITE
         else:
             self.first = BLACK
-            self.game.turn = BLACK
+        if self.game is not None:
+            self.game.turn = self.first
 
     def select_players(self, selected, value):
         """
@@ -171,11 +270,11 @@ may then use his new king on his next move.
         """
         if selected[0][0] == '1 vs AI':
             self.AI_activated = True
-            self.game.AI_activated = True
 
         else:
             self.AI_activated = False
-            self.game.AI_activated = False
+        if self.game is not None:
+            self.game.AI_activated = self.AI_activated
 
     def set_difficulty(self, selected, value):
         """
@@ -196,11 +295,11 @@ may then use his new king on his next move.
         """
         if selected[0][0] == 'Yes':
             self.hint = True
-            self.game.hint = True
 
         elif selected[0][0] == 'No':
             self.hint = False
-            self.game.hint = False
+        if self.game is not None:
+            self.game.hint = self.hint
 
     def get_row_col_from_mouse(self, pos):
         """
@@ -212,6 +311,15 @@ may then use his new king on his next move.
 
         return row, col
 
+    def wait_events(self, timeout_ms):
+        """
+        Sleeps until there is an event or 'timeout_ms' milliseconds have passed, and returns the pending events
+        """
+        event = pygame.event.wait(timeout_ms)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
     # Run Checkers
     def run_game(self, reset=False):
         """
@@ -221,56 +329,101 @@ may then use his new king on his next move.
         clock = pygame.time.Clock()
 
         global main_menu, game_over_menu
-        # AI object from the AI class that will be the AI player
-        AI_player = AI(self.difficulty)
+        # AI player of the selected difficulty (the same object is reused by the games of that difficulty), which is
+        # only needed in '1 vs AI' games, so '1 vs 1' games do not wait for the engine. Any search of a previous game is
+        # aborted
+        if self.AI_activated:
+            self.ai_worker.set_ai(self.AI_player())
+        else:
+            self.ai_worker.cancel()
+
+        # The game is created the first time that it is played
+        if self.game is None:
+            self.game = Game(self.WIN, self.first)
+            reset = True
 
         # Disable main menu to show the checkers game (board and pieces)
         main_menu.disable()
         main_menu.full_reset()
-
-        # Show some game statistics in console while playing
-        print('*****')
-        if self.game.turn == WHITE:
-            print('Turn: WHITE')
-        else:
-            print('Turn: BLACK')
-        print(self.game.board.game_state(True))
+        # The menus have been drawn over the board, so the whole window is drawn in the first frame
+        self.game.redraw()
 
         while run:
-            # Set the FPS
-            clock.tick(self.FPS)
+            # Set the FPS (in the event-driven mode, the loop waits for the events instead)
+            if not self.event_driven:
+                clock.tick(self.FPS)
             # If reset is True, the game options are reset
             if reset:
                 self.game.reset(self.first, self.AI_activated, self.hint)
                 reset = False
 
-            # If the game has ended, the game over menu is called
+                # Show some game statistics in console while playing (once per game)
+                print('*****')
+                if self.game.turn == WHITE:
+                    print('Turn: WHITE')
+                else:
+                    print('Turn: BLACK')
+                print(self.game.board.game_state(True))
+
+            # If the game has ended, the pondering (if the player's move ended the game) is aborted, the pondering
+            # statistics are shown in console (once per game) and the game over menu is called
             if self.game.end_game:
+                self.ai_worker.cancel()
+                if self.game.AI_activated:
+                    print('Pondering:', self.ai_worker.ponder_stats())
                 self.end_game_menu()
 
             # Since AI is always playing blacks, if it is the black turn and the it is a '1 vs AI' game, the
-            # minimax alpha beta pruning is called to select its move
-            if self.game.turn == BLACK and self.game.AI_activated:
+            # minimax alpha beta pruning is called to select its move. The search deepens iteratively until the time
+            # budget of the selected difficulty runs out, and it runs in a background thread so that the window keeps
+            # responding. Its move is made once the search has finished
+            AI_turn = self.game.turn == BLACK and self.game.AI_activated and not self.game.end_game
+            AI_moved = False
+            if AI_turn:
                 board = self.game.current_board()
-                eval, ai_move = AI_player.minimax_alpha_beta(board, self.difficulty, self.game, float('-inf'), float('inf'))
-                self.game.AI_turn(ai_move)
-
-            # Human player's turn
+                if self.ai_worker.ready() and self.ai_worker.matches(board):
+                    self.game.thinking = False
+                    self.game.AI_turn(self.ai_worker.result(board))
+                    AI_turn = False
+                    AI_moved = True
+                elif not self.ai_worker.busy():
+                    self.ai_worker.start(board, SEARCH_TIME_MS[self.difficulty])
+                    self.game.thinking = True
+
+            # While the player is thinking its move (and it has not started a multiple jump), the AI ponders its
+            # replies to the most likely moves
+            elif self.game.AI_activated and not self.game.end_game and not self.game.moved:
+                self.ai_worker.ponder(self.game.current_board(), SEARCH_TIME_MS[self.difficulty])
+
+            # In the event-driven mode, the changes are drawn before sleeping until the next event. After an AI move,
+            # the loop does not sleep, so that the pondering (or the end of the game) starts at once
+            if self.event_driven and not AI_moved:
+                self.game.update()
+                events = self.wait_events(self.EVENT_TIMEOUT_MS)
             else:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        run = False
-
-                    # If the mouse button is clicked, piece selection is on
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        pos = pygame.mouse.get_pos()
-                        row, col = self.get_row_col_from_mouse(pos)
-                        self.game.select(row, col)
-
-                    # If the escape key is pressed, the pause menu is called
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_ESCAPE:
-                            self.pause_menu()
+                events = pygame.event.get()
+
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.ai_worker.cancel()
+                    run = False
+
+                # If the window has been exposed (e.g., uncovered or restored), it is drawn entirely
+                if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.game.redraw()
+
+                # If the mouse button is clicked during the player's turn, piece selection is on
+                if event.type == pygame.MOUSEBUTTONDOWN and not AI_turn:
+                    pos = pygame.mouse.get_pos()
+                    row, col = self.get_row_col_from_mouse(pos)
+                    self.game.select(row, col)
+
+                # If the escape key is pressed, the search is aborted and the pause menu is called
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        self.ai_worker.cancel()
+                        self.game.thinking = False
+                        self.pause_menu()
 
             # Update game
             self.game.update()
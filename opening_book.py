@@ -0,0 +1,164 @@
+import argparse
+import os
+import struct
+from game_constants import WHITE, BLACK
+from board import Board
+from bitboard import square, ROW_OF, COL_OF
+from zobrist import BLACK_TO_MOVE
+from AI import AI
+
+"""
+.py file with the opening book: an offline builder that searches deeply the positions reached from the initial position
+(with both players starting) and a lookup class used by the AI to play those positions instantly. Run
+'python opening_book.py --help' to see the builder options
+"""
+
+# The file starts with a header with the difficulty (heuristic) of the AI that built it, since the book moves are only
+# the best ones for that heuristic
+MAGIC = b'OBK1'
+HEADER = struct.Struct('<4sB')
+
+# Each record has the position hash (with the black player to move), the evaluation, the starting square of the piece,
+# the number of squares of its path and the path itself (squares as in BitBoard, up to MAX_PATH)
+MAX_PATH = 8
+RECORD = struct.Struct('<QfBB{}B'.format(MAX_PATH))
+
+
+def encode_record(key, evaluation, move):
+    """
+    Packs a book entry. 'move' is a ((row, col), path) move as returned by AI.encode_move
+    """
+    (row, col), path = move
+    squares = [square(path_row, path_col) for path_row, path_col in path]
+    return RECORD.pack(key, evaluation, square(row, col), len(squares), *(squares + [0] * (MAX_PATH - len(squares))))
+
+
+def decode_record(data, offset):
+    """
+    Unpacks the book entry at a given offset as (key, evaluation, ((row, col), path))
+    """
+    key, evaluation, start, length, *path = RECORD.unpack_from(data, offset)
+    move = (ROW_OF[start], COL_OF[start]), tuple((ROW_OF[sq], COL_OF[sq]) for sq in path[:length])
+    return key, evaluation, move
+
+
+class OpeningBook:
+    """
+    OpeningBook class that loads a book file into a dictionary (position hash -> (evaluation, move)), so that the AI can
+    look up its move in constant time. 'difficulty' is the difficulty of the AI that built the book, which is the only
+    one that should use it
+    """
+    def __init__(self, path='opening_book.bin'):
+        self.path = path
+        self.entries = {}
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, self.difficulty = HEADER.unpack_from(data, 0) if len(data) >= HEADER.size else (None, None)
+        if magic != MAGIC:
+            raise ValueError('{} is not an opening book file (books built before the header was added must be built '
+                             'again)'.format(path))
+        for offset in range(HEADER.size, len(data), RECORD.size):
+            key, evaluation, move = decode_record(data, offset)
+            self.entries[key] = (evaluation, move)
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, board):
+        """
+        Returns the (evaluation, (piece, path)) entry for a board with the black player (AI) to move, or None if the
+        position is not in the book
+        """
+        entry = self.entries.get(board.hash ^ BLACK_TO_MOVE)
+        if entry is None:
+            return None
+        evaluation, ((row, col), path) = entry
+        piece = board.get_piece(row, col)
+        # The piece is checked in case of a hash collision
+        if piece == 0 or piece.color != BLACK:
+            return None
+        self.hits += 1
+        return evaluation, (piece, path)
+
+
+class BookBuilder:
+    """
+    BookBuilder class to build the opening book. The positions of the black player are searched with a fixed depth and
+    its best move is played, while for the white player the most common replies (the best ones according to a shallower
+    search) are followed
+    """
+    def __init__(self, difficulty=3, depth=6, reply_depth=2, replies=3):
+        self.difficulty = difficulty
+        self.ai = AI(difficulty)
+        self.depth = depth
+        self.reply_depth = reply_depth
+        self.replies = replies
+        self.entries = {}
+
+    def build(self, plies):
+        """
+        Explores 'plies' moves from the initial position, with the black and with the white player starting
+        """
+        for first in (BLACK, WHITE):
+            self.expand(Board(), first, plies)
+        return self.entries
+
+    def expand(self, board, color, plies):
+        """
+        Recursively adds the positions reached from a given board to the book
+        """
+        if plies == 0 or board.game_state()[0]:
+            return
+        ai = self.ai
+        if color == BLACK:
+            key = board.hash ^ BLACK_TO_MOVE
+            if key not in self.entries:
+                evaluation, move = ai.minimax_alpha_beta(board, self.depth, True, float('-inf'), float('inf'))
+                self.entries[key] = (evaluation, ai.encode_move(move))
+                print('Book positions:', len(self.entries))
+            undo = ai.make_move(board, ai.decode_move(board, self.entries[key][1]))
+            self.expand(board, WHITE, plies - 1)
+            ai.unmake_move(board, undo)
+            return
+
+        # The white replies are sorted by the evaluation of a shallow search (the lower, the better for white)
+        scored = []
+        for move in ai.get_all_moves(board, WHITE):
+            code = ai.encode_move(move)
+            undo = ai.make_move(board, move)
+            scored.append((ai.minimax_alpha_beta(board, self.reply_depth, True, float('-inf'), float('inf'))[0], code))
+            ai.unmake_move(board, undo)
+        scored.sort(key=lambda item: item[0])
+        for _, code in scored[:self.replies]:
+            undo = ai.make_move(board, ai.decode_move(board, code))
+            self.expand(board, BLACK, plies - 1)
+            ai.unmake_move(board, undo)
+
+    def save(self, path='opening_book.bin'):
+        """
+        Writes the book file (moves with a path longer than MAX_PATH are not stored)
+        """
+        with open(path + '.tmp', 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.difficulty))
+            for key, (evaluation, move) in sorted(self.entries.items()):
+                if len(move[1]) <= MAX_PATH:
+                    f.write(encode_record(key, evaluation, move))
+        os.replace(path + '.tmp', path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Opening book builder')
+    parser.add_argument('--plies', type=int, default=8, help='number of moves explored from the initial position')
+    parser.add_argument('--depth', type=int, default=6, help='search depth of the AI positions')
+    parser.add_argument('--replies', type=int, default=3, help='number of white replies followed in each position')
+    parser.add_argument('--difficulty', type=int, default=3, help='heuristic used by the search')
+    parser.add_argument('--output', default='opening_book.bin')
+    args = parser.parse_args()
+    builder = BookBuilder(args.difficulty, args.depth, replies=args.replies)
+    builder.build(args.plies)
+    builder.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
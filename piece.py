@@ -1,10 +1,9 @@
-import pygame
-from game_constants import GREY, SQUARE_SIZE, CROWN
+from game_constants import SQUARE_SIZE
 
 
 class Piece:
     """
-    Piece class to build any piece of the board
+    Piece class to build any piece of the board (it is drawn by the render module)
     """
     PADDING = 10
     OUTLINE = 2
@@ -31,17 +30,6 @@ class Piece:
         """
         self.king = True
 
-    def draw(self, win):
-        """
-        Draw each piece and the crown of any king
-        """
-        radius = SQUARE_SIZE // 2 - self.PADDING
-        pygame.draw.circle(win, GREY, (self.x, self.y), radius + self.OUTLINE)
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
-        # If the current piece is a king, put the crown image in the center of the piece
-        if self.king:
-            win.blit(CROWN, (self.x - CROWN.get_width() // 2, self.y - CROWN.get_height() // 2))
-
     def move(self, row, col):
         """
         Move a piece to a given row and column
@@ -0,0 +1,40 @@
+import pygame
+import sprites
+from game_constants import ROWS, COLS, SQUARE_SIZE
+
+"""
+.py file with the rendering layer: it draws the boards (and their pieces) of the rules engine, which does not depend on
+pygame, with the sprites rendered by the sprites module
+"""
+
+
+def draw_board(win, board):
+    """
+    Draw the checkerboard and each piece of a board
+    """
+    win.blit(sprites.squares(), (0, 0))
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.get_piece(row, col)
+            if piece != 0:
+                draw_piece(win, piece)
+
+
+def draw_square(win, board, row, col):
+    """
+    Draw a single square of a board (copied from the checkerboard sprite) and its piece, if any. Returns the rect of
+    the square
+    """
+    rect = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+    win.blit(sprites.squares(), rect, rect)
+    piece = board.get_piece(row, col)
+    if piece != 0:
+        draw_piece(win, piece)
+    return rect
+
+
+def draw_piece(win, piece):
+    """
+    Draw a piece (with the crown of any king) by blitting its sprite
+    """
+    win.blit(sprites.piece(piece.color, piece.king), (piece.x - SQUARE_SIZE // 2, piece.y - SQUARE_SIZE // 2))
@@ -0,0 +1,127 @@
+import json
+import math
+
+"""
+.py file with the statistics of the AI search, which are filled in by AI.iterative_deepening for every move and can be
+appended to a JSON lines file (one line per move)
+"""
+
+
+def bound(value):
+    """
+    Bound of a search window as a JSON value: infinite bounds (which JSON cannot represent) are written as null
+    """
+    return value if math.isfinite(value) else None
+
+
+class SearchStats:
+    """
+    SearchStats class with the statistics of the last move searched by the AI: nodes, leaf evaluations, beta cutoffs
+    (and how many of them were caused by the first move searched), effective branching factor, time spent generating
+    moves and evaluating positions and time and nodes of each depth of the iterative deepening.
+
+    The counters are kept by the AI in plain integers, so they cost nothing. The time spent generating moves and
+    evaluating positions is only measured if 'timing' is True, and each interior node searched is only recorded in
+    'trace' if 'tracing' is True, since both slow down the search
+    """
+    def __init__(self, timing=False, tracing=False):
+        self.timing = timing
+        self.tracing = tracing
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the statistics before a new search
+        """
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.generated = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        self.researches = 0
+        self.movegen_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.seconds = 0.0
+        self.depth = 0
+        self.depths = []
+        self.trace = []
+        self.evaluation = None
+        self.move = None
+        self.book = False
+        self.table = None
+
+    def add_depth(self, depth, seconds, nodes, evaluation):
+        """
+        Records a completed iteration of the iterative deepening: its depth, time, nodes and evaluation
+        """
+        self.depths.append({'depth': depth, 'seconds': seconds, 'nodes': nodes, 'evaluation': evaluation})
+
+    def add_node(self, ply, depth, alpha, beta, evaluation, move, nodes):
+        """
+        Records an interior node of the search (only while tracing): its distance to the root, remaining depth, window
+        (None for an infinite bound), result and number of nodes of its subtree
+        """
+        self.trace.append({'ply': ply, 'depth': depth, 'alpha': bound(alpha), 'beta': bound(beta),
+                           'evaluation': evaluation, 'move': move, 'nodes': nodes})
+
+    def collect(self, ai, evaluation, move, seconds):
+        """
+        Takes the counters of the AI at the end of a search, along with its result and total time
+        """
+        self.nodes = ai.nodes
+        self.leaf_evaluations = ai.leaf_evaluations
+        self.generated = ai.generated
+        self.cutoffs = ai.cutoffs
+        self.first_cutoffs = ai.first_cutoffs
+        self.researches = ai.researches
+        self.movegen_seconds = ai.movegen_seconds
+        self.eval_seconds = ai.eval_seconds
+        self.depth = ai.depth_reached
+        self.evaluation = evaluation
+        self.move = ai.encode_move(move)
+        self.seconds = seconds
+        self.table = ai.table.stats()
+
+    def first_move_cutoff_rate(self):
+        """
+        Fraction of the beta cutoffs caused by the first move searched (the higher, the better the move ordering)
+        """
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def branching_factor(self):
+        """
+        Effective branching factor: nodes ^ (1 / depth) for the whole search
+        """
+        return self.nodes ** (1 / max(self.depth, 1))
+
+    def as_dict(self):
+        """
+        Statistics as a dictionary that can be written as JSON. The branching factor of each depth is the ratio between
+        its nodes and the ones of the previous depth
+        """
+        depths = []
+        previous = None
+        for entry in self.depths:
+            entry = dict(entry)
+            entry['branching_factor'] = entry['nodes'] / previous if previous else None
+            previous = entry['nodes']
+            depths.append(entry)
+        stats = {'nodes': self.nodes, 'leaf_evaluations': self.leaf_evaluations, 'generated': self.generated,
+                 'cutoffs': self.cutoffs, 'first_move_cutoff_rate': self.first_move_cutoff_rate(),
+                 'researches': self.researches, 'depth': self.depth, 'branching_factor': self.branching_factor(),
+                 'seconds': self.seconds, 'evaluation': self.evaluation, 'move': self.move, 'book': self.book,
+                 'depths': depths, 'table': self.table}
+        if self.timing:
+            stats['movegen_seconds'] = self.movegen_seconds
+            stats['eval_seconds'] = self.eval_seconds
+        if self.tracing:
+            stats['trace'] = self.trace
+        return stats
+
+    def write_jsonl(self, path):
+        """
+        Appends the statistics of the last search as one line of a JSON lines file. Infinite or NaN values are rejected,
+        since they are not valid JSON
+        """
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.as_dict(), allow_nan=False) + '\n')
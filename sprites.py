@@ -0,0 +1,108 @@
+import pygame
+from game_constants import (GREY, WHITE, BLACK, WHITISH, BROWN, RED, BLUE, ROWS, COLS, SQUARE_SIZE, CROWN_IMAGE,
+                            CROWN_SIZE)
+from piece import Piece
+
+"""
+.py file with the sprites of the checkerboard, of the pieces (each color with and without crown) and of the highlighted
+squares, which are rendered once, so that drawing a piece or a highlight is a single blit. They are rendered again if
+'load' is called with a different square size (e.g., when the window is resized)
+"""
+
+# Color of the transparent pixels of the piece sprites (it does not appear in any piece)
+TRANSPARENT = (255, 0, 255)
+
+# Size of the squares of the loaded sprites and sprites by key: 'squares' for the checkerboard, ('piece', color, king,
+# outline) for the pieces (the selected piece is drawn without outline) and ('overlay', color) for the highlighted
+# squares
+_size = None
+_sprites = {}
+_crown = None
+
+
+def crown():
+    """
+    King's crown image, loaded the first time it is needed
+    """
+    global _crown
+    if _crown is None:
+        _crown = pygame.transform.scale(pygame.image.load(CROWN_IMAGE), CROWN_SIZE)
+    return _crown
+
+
+def load(square_size=SQUARE_SIZE):
+    """
+    Renders every sprite for a given square size, unless they have already been rendered for that size
+    """
+    global _size
+    if square_size == _size:
+        return
+    _sprites.clear()
+    # Once the window has been created, the sprites are converted to its pixel format so that blitting them is faster
+    convert = pygame.display.get_surface() is not None
+
+    # Checkerboard (without pieces)
+    squares = pygame.Surface((COLS * square_size, ROWS * square_size))
+    squares.fill(BROWN)
+    for row in range(ROWS):
+        for col in range(row % 2, COLS, 2):
+            pygame.draw.rect(squares, WHITISH, (row * square_size, col * square_size, square_size, square_size))
+    _sprites['squares'] = squares.convert() if convert else squares
+
+    radius = square_size // 2 - Piece.PADDING
+    crown_image = crown()
+    center = (square_size // 2, square_size // 2)
+    # The pieces are opaque (the crown is blended when the sprite is rendered), so their transparent pixels are marked
+    # with a color key and run-length encoded, which is much faster to blit than per-pixel alpha
+    for color in (WHITE, BLACK):
+        for king in (False, True):
+            for outline in (False, True):
+                sprite = pygame.Surface((square_size, square_size))
+                sprite.fill(TRANSPARENT)
+                if outline:
+                    pygame.draw.circle(sprite, GREY, center, radius + Piece.OUTLINE)
+                pygame.draw.circle(sprite, color, center, radius)
+                # The crown image is put in the center of the kings
+                if king:
+                    sprite.blit(crown_image, (center[0] - crown_image.get_width() // 2,
+                                              center[1] - crown_image.get_height() // 2))
+                sprite.set_colorkey(TRANSPARENT, pygame.RLEACCEL)
+                _sprites[('piece', color, king, outline)] = sprite.convert() if convert else sprite
+
+    # Selected piece: translucent red over the square
+    selected = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+    selected.fill(RED)
+    _sprites[('overlay', RED)] = selected.convert_alpha() if convert else selected
+
+    # Valid moves: translucent blue over a white square, so the sprite is opaque
+    hint = pygame.Surface((square_size, square_size))
+    hint.fill(WHITE)
+    blue = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+    blue.fill(BLUE)
+    hint.blit(blue, (0, 0))
+    _sprites[('overlay', BLUE)] = hint.convert() if convert else hint
+    _size = square_size
+
+
+def squares():
+    """
+    Sprite of the checkerboard
+    """
+    load(_size or SQUARE_SIZE)
+    return _sprites['squares']
+
+
+def piece(color, king, outline=True):
+    """
+    Sprite of a piece of a given color and king status
+    """
+    load(_size or SQUARE_SIZE)
+    return _sprites[('piece', color, king, outline)]
+
+
+def overlay(color):
+    """
+    Sprite of a highlighted square: RED for the selected piece and BLUE for its valid moves
+    """
+    load(_size or SQUARE_SIZE)
+    return _sprites[('overlay', color)]
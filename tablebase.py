@@ -0,0 +1,354 @@
+import argparse
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import comb
+from game_constants import WHITE, BLACK
+from bitboard import BitBoard, SQUARES, STEP, FORWARD, ALL_DIRECTIONS, KING_ROW, bit_squares
+
+"""
+.py file with the endgame tablebase: an offline generator that solves every position with up to N pieces by retrograde
+analysis, and a lookup class that opens the generated file with mmap so that the AI can probe it during the search.
+
+Positions are grouped in slices by their material (black men, black kings, white men, white kings). Each position of a
+slice has an index built from the ranks of the squares of each group of pieces and the side to move, and its value is
+stored in one byte: 0 for invalid positions, 1 for draws, 2 + 2 * d for a win in d plies and 3 + 2 * d for a loss in d
+plies (from the point of view of the side to move). Run 'python tablebase.py --help' to see the generator options
+"""
+
+DRAW = 1
+MAX_DISTANCE = 126
+MAGIC = b'DTB1'
+HEADER = struct.Struct('<4sBH')
+SLICE_ENTRY = struct.Struct('<4BQQ')
+
+# The men move backwards in the opposite directions of their forward moves
+BACKWARD = {WHITE: FORWARD[BLACK], BLACK: FORWARD[WHITE]}
+
+# Subsets of k squares sorted by their rank (combinatorial number system) and the rank of each subset
+_subsets = {}
+_ranks = {}
+
+
+def subsets(k):
+    """
+    Bitboards with k squares set, sorted by rank
+    """
+    if k not in _subsets:
+        ordered = sorted(combinations(range(SQUARES), k), key=lambda squares: squares[::-1])
+        _subsets[k] = [sum(1 << sq for sq in squares) for squares in ordered]
+        _ranks[k] = {bits: rank for rank, bits in enumerate(_subsets[k])}
+    return _subsets[k]
+
+
+def rank(bits, k):
+    """
+    Rank of a bitboard with k squares set
+    """
+    subsets(k)
+    return _ranks[k][bits]
+
+
+def signature(position):
+    """
+    Material of a position: (black men, black kings, white men, white kings)
+    """
+    return ((position.black & ~position.kings).bit_count(), (position.black & position.kings).bit_count(),
+            (position.white & ~position.kings).bit_count(), (position.white & position.kings).bit_count())
+
+
+def slice_size(sig):
+    """
+    Number of indices of a slice (including the invalid positions)
+    """
+    size = 2
+    for count in sig:
+        size *= comb(SQUARES, count)
+    return size
+
+
+def position_index(sig, position, color):
+    """
+    Index of a position (with a given color to move) in its slice
+    """
+    groups = (position.black & ~position.kings, position.black & position.kings,
+              position.white & ~position.kings, position.white & position.kings)
+    index = 0
+    for count, bits in zip(sig, groups):
+        index = index * comb(SQUARES, count) + rank(bits, count)
+    return index * 2 + (0 if color == BLACK else 1)
+
+
+def index_position(sig, index):
+    """
+    Position and color to move of a given index. None is returned for invalid indices: pieces on the same square or men
+    on their king's row (they would be kings)
+    """
+    color = BLACK if index % 2 == 0 else WHITE
+    index //= 2
+    groups = []
+    for count in reversed(sig):
+        index, group_rank = divmod(index, comb(SQUARES, count))
+        groups.append(subsets(count)[group_rank])
+    white_kings, white_men, black_kings, black_men = groups
+
+    occupied = 0
+    for bits in groups:
+        if occupied & bits:
+            return None
+        occupied |= bits
+    if black_men & KING_ROW[BLACK] or white_men & KING_ROW[WHITE]:
+        return None
+    return BitBoard(black_men | black_kings, white_men | white_kings, black_kings | white_kings), color
+
+
+def signatures(max_pieces):
+    """
+    Every material with at least one piece of each color and at most 'max_pieces' pieces, grouped in levels that can
+    be built in parallel. A slice depends on the slices with fewer pieces (captures) and with one man less (promotions),
+    so the levels are sorted by number of pieces and then by number of men
+    """
+    levels = {}
+    for black_men in range(max_pieces + 1):
+        for black_kings in range(max_pieces + 1 - black_men):
+            for white_men in range(max_pieces + 1 - black_men - black_kings):
+                for white_kings in range(max_pieces + 1 - black_men - black_kings - white_men):
+                    sig = (black_men, black_kings, white_men, white_kings)
+                    if black_men + black_kings and white_men + white_kings:
+                        level = (sum(sig), black_men + white_men)
+                        levels.setdefault(level, []).append(sig)
+    return [levels[level] for level in sorted(levels)]
+
+
+def encode(win, distance):
+    if distance > MAX_DISTANCE:
+        raise ValueError('Distance to the end of the game too long for the tablebase format')
+    return 2 + 2 * distance + (0 if win else 1)
+
+
+def decode(value):
+    """
+    Converts a stored byte to ('win' | 'loss' | 'draw', distance). None is returned for invalid positions
+    """
+    if value == 0:
+        return None
+    if value == DRAW:
+        return 'draw', 0
+    distance, loss = divmod(value - 2, 2)
+    return ('loss' if loss else 'win'), distance
+
+
+def slice_path(directory, sig):
+    return os.path.join(directory, '{}-{}-{}-{}.bin'.format(*sig))
+
+
+class SliceLoader:
+    """
+    Loads (and keeps in memory) the slices already built by the generator
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.slices = {}
+
+    def value(self, position, color):
+        """
+        Value of a position for the side to move, as a decoded (result, distance) tuple
+        """
+        # Positions with no pieces of one color are not stored: the game is over
+        if not position.black or not position.white:
+            end_game, winner = position.game_state()
+            return ('win' if (winner == 'Black') == (color == BLACK) else 'loss'), 0
+        sig = signature(position)
+        if sig not in self.slices:
+            with open(slice_path(self.directory, sig), 'rb') as f:
+                self.slices[sig] = f.read()
+        return decode(self.slices[sig][position_index(sig, position, color)])
+
+
+def predecessors(position, color):
+    """
+    Positions (with the opponent to move) from which the opponent can reach a given position with a quiet move that
+    does not crown the piece, i.e., positions of the same slice. A quiet move is only legal if the opponent has no jumps
+    and the game was not over
+    """
+    mover = WHITE if color == BLACK else BLACK
+    own = position.pieces(mover)
+    empty = position.empty()
+    result = []
+    for sq in bit_squares(own):
+        king = position.kings >> sq & 1
+        for d in (ALL_DIRECTIONS if king else BACKWARD[mover]):
+            origin = STEP[sq][d]
+            if origin is None or not empty >> origin & 1:
+                continue
+            moved = (own & ~(1 << sq)) | (1 << origin)
+            kings = (position.kings & ~(1 << sq)) | ((1 << origin) if king else 0)
+            if mover == BLACK:
+                previous = BitBoard(moved, position.white, kings)
+            else:
+                previous = BitBoard(position.black, moved, kings)
+            if previous.has_captures(mover) or previous.game_state()[0]:
+                continue
+            result.append(previous)
+    return result
+
+
+def build_slice(sig, directory):
+    """
+    Solves every position of a slice and writes it to its file. Positions are resolved in order of distance to the end
+    of the game with a bucket queue: each resolved child sends an event to its parent at distance + 1. A parent wins at
+    the first event of a lost child and loses when every child has been won. The rest of positions are draws
+    """
+    loader = SliceLoader(directory)
+    size = slice_size(sig)
+    values = bytearray(size)
+    remaining = [0] * size
+    buckets = {0: []}
+
+    def add_event(distance, index, win):
+        buckets.setdefault(distance, []).append((index, win))
+
+    # Initial pass: terminal positions and moves to other slices (captures and promotions), whose values are known
+    resolved = []
+    for index in range(size):
+        decoded = index_position(sig, index)
+        if decoded is None:
+            continue
+        position, color = decoded
+        end_game, winner = position.game_state()
+        if end_game:
+            values[index] = encode((winner == 'Black') == (color == BLACK), 0)
+            resolved.append((index, position, color))
+            continue
+        moves = position.get_moves(color)
+        remaining[index] = len(moves)
+        opponent = WHITE if color == BLACK else BLACK
+        for move in moves:
+            child = position.apply(move, color)
+            if child.black and child.white and signature(child) == sig:
+                continue
+            result, distance = loader.value(child, opponent)
+            if result == 'loss':
+                add_event(distance + 1, index, True)
+            elif result == 'win':
+                add_event(distance + 1, index, False)
+
+    distance = 0
+    while buckets:
+        for index, win in buckets.pop(distance, []):
+            if values[index]:
+                continue
+            if win:
+                values[index] = encode(True, distance)
+            else:
+                remaining[index] -= 1
+                if remaining[index]:
+                    continue
+                values[index] = encode(False, distance)
+            position, color = index_position(sig, index)
+            resolved.append((index, position, color))
+
+        # Each position resolved at this distance sends an event to its predecessors
+        for index, position, color in resolved:
+            lost = values[index] % 2 == 1
+            mover = WHITE if color == BLACK else BLACK
+            for previous in predecessors(position, color):
+                add_event(distance + 1, position_index(sig, previous, mover), lost)
+        resolved = []
+        distance += 1
+
+    for index in range(size):
+        if not values[index] and index_position(sig, index) is not None:
+            values[index] = DRAW
+
+    # The file is renamed once complete, so an interrupted build never leaves a partial slice behind
+    path = slice_path(directory, sig)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(values)
+    os.replace(path + '.tmp', path)
+    return sig
+
+
+def build(max_pieces, directory='tablebase_slices', output='tablebase.bin', workers=None):
+    """
+    Builds every slice with up to 'max_pieces' pieces (the slices of each level in parallel) and writes the tablebase
+    file. Slices already in 'directory' are not built again, so an interrupted build can be resumed
+    """
+    os.makedirs(directory, exist_ok=True)
+    levels = signatures(max_pieces)
+    with ProcessPoolExecutor(workers) as executor:
+        for level in levels:
+            pending = [sig for sig in level if not os.path.exists(slice_path(directory, sig))]
+            for sig in executor.map(build_slice, pending, [directory] * len(pending)):
+                print('Built slice', sig)
+
+    all_signatures = [sig for level in levels for sig in level]
+    offset = HEADER.size + SLICE_ENTRY.size * len(all_signatures)
+    with open(output + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, max_pieces, len(all_signatures)))
+        for sig in all_signatures:
+            f.write(SLICE_ENTRY.pack(*sig, offset, slice_size(sig)))
+            offset += slice_size(sig)
+        for sig in all_signatures:
+            with open(slice_path(directory, sig), 'rb') as slice_file:
+                f.write(slice_file.read())
+    os.replace(output + '.tmp', output)
+
+
+class Tablebase:
+    """
+    Tablebase class to probe a generated tablebase file. The file is memory-mapped, so only the pages of the probed
+    positions are read from disk
+    """
+    def __init__(self, path='tablebase.bin'):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.max_pieces, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError('{} is not a tablebase file'.format(path))
+        self.offsets = {}
+        for i in range(count):
+            *sig, offset, size = SLICE_ENTRY.unpack_from(self.data, HEADER.size + i * SLICE_ENTRY.size)
+            self.offsets[tuple(sig)] = offset
+        self.hits = 0
+
+    def probe(self, position, color):
+        """
+        Returns the (result, distance) tuple of a BitBoard position with a given color to move, or None if the position
+        is not in the tablebase
+        """
+        sig = signature(position)
+        offset = self.offsets.get(sig)
+        if offset is None:
+            return None
+        self.hits += 1
+        return decode(self.data[offset + position_index(sig, position, color)])
+
+    def probe_board(self, board, color):
+        """
+        Same as 'probe' for a Board object
+        """
+        if board.black_left + board.white_left > self.max_pieces:
+            return None
+        return self.probe(BitBoard.from_board(board), color)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Endgame tablebase generator')
+    parser.add_argument('--pieces', type=int, default=3, help='maximum number of pieces on the board')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: cores)')
+    parser.add_argument('--slices', default='tablebase_slices', help='directory of the built slices (to resume)')
+    parser.add_argument('--output', default='tablebase.bin')
+    args = parser.parse_args()
+    build(args.pieces, args.slices, args.output, args.workers)
+
+
+if __name__ == '__main__':
+    main()
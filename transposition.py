@@ -0,0 +1,78 @@
+"""
+.py file with the transposition table used by the AI to store the result of already searched positions
+"""
+
+# Bound type of a stored evaluation: exact value, lower bound (the search failed high) or upper bound (failed low)
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Approximate number of bytes used by one stored entry (entry tuple, hash key, evaluation and best move)
+ENTRY_BYTES = 256
+
+
+class TranspositionTable:
+    """
+    TranspositionTable class with a fixed number of buckets. The bucket of a position is given by its hash key and each
+    bucket holds two entries: a depth-preferred one, only replaced by searches at least as deep, and an always-replace
+    one that keeps the most recent position. Each entry is a tuple (key, depth, bound, evaluation, best move)
+    """
+    def __init__(self, memory_mb=16):
+        self.size = max(1, int(memory_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def clear(self):
+        """
+        Removes every entry and resets the counters
+        """
+        self.deep = [None] * self.size
+        self.recent = [None] * self.size
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def probe(self, key):
+        """
+        Returns the entry stored for a given key (None if the position is not in the table)
+        """
+        index = key % self.size
+        for entry in (self.deep[index], self.recent[index]):
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, evaluation, best_move):
+        """
+        Stores the result of a search. If the new search is at least as deep as the depth-preferred entry, it takes its
+        place and the previous entry is moved to the always-replace slot. Otherwise, it goes to the always-replace slot
+        """
+        index = key % self.size
+        entry = (key, depth, bound, evaluation, best_move)
+        deep = self.deep[index]
+        self.stores += 1
+        if deep is None or deep[0] == key or depth >= deep[1]:
+            if deep is not None and deep[0] != key:
+                self.recent[index] = deep
+                self.overwrites += 1
+            self.deep[index] = entry
+        else:
+            if self.recent[index] is not None and self.recent[index][0] != key:
+                self.overwrites += 1
+            self.recent[index] = entry
+
+    def hit_rate(self):
+        """
+        Fraction of probes that found the position in the table
+        """
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self):
+        """
+        Table counters as a dictionary
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(), 'stores': self.stores,
+                'overwrites': self.overwrites, 'buckets': self.size}
@@ -0,0 +1,38 @@
+import random
+from game_constants import WHITE, BLACK, ROWS, COLS
+
+"""
+.py file with the Zobrist keys used to hash board positions. Each (square, piece kind) pair has a random 64-bit key and
+the hash of a position is the XOR of the keys of its pieces, so it can be updated incrementally when a piece is moved,
+removed or crowned
+"""
+
+# The keys are generated with a fixed seed so that hashes are the same in every run (e.g., for files stored on disk)
+_random = random.Random(2021)
+
+# Index of each piece kind in the key table
+KINDS = {(WHITE, False): 0, (WHITE, True): 1, (BLACK, False): 2, (BLACK, True): 3}
+PIECE_KEYS = [[[_random.getrandbits(64) for _ in KINDS] for _ in range(COLS)] for _ in range(ROWS)]
+
+# Key XORed to the position hash when it is the black player's turn
+BLACK_TO_MOVE = _random.getrandbits(64)
+
+
+def piece_key(row, col, color, king):
+    """
+    Key of a piece of a given color and king status in a given square
+    """
+    return PIECE_KEYS[row][col][KINDS[(color, king)]]
+
+
+def board_hash(grid):
+    """
+    Computes the hash of a board grid (Board.board) from scratch. Board keeps it updated incrementally in its 'hash'
+    attribute
+    """
+    h = 0
+    for row in grid:
+        for piece in row:
+            if piece != 0:
+                h ^= piece_key(piece.row, piece.col, piece.color, piece.king)
+    return h